@@ -0,0 +1,154 @@
+"""
+Benchmark concurrent SQLite reads and writes with stock and tuned settings.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.db.sqlite3.base import PRAGMAS, apply_pragmas
+
+
+# Django's stock SQLite settings: rollback journal, synchronous FULL, the
+# sqlite3 module's 5 second busy timeout and deferred transactions
+PROFILES = {
+    'stock': ({}, 'DEFERRED'),
+    'tuned': (PRAGMAS, 'IMMEDIATE'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent activity-logging writers and leaderboard readers against a "
+        "scratch SQLite database with Django's stock settings and with the tuned backend."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help="Writer threads (default: 4)")
+        parser.add_argument('--readers', type=int, default=8, help="Reader threads (default: 8)")
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=5.0,
+            help="Duration of each run (default: 5)"
+        )
+        parser.add_argument('--users', type=int, default=1000, help="Synthetic users (default: 1000)")
+        parser.add_argument('--seed', type=int, default=42)
+    
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'profile':>8} {'writes/s':>10} {'reads/s':>10} {'locked':>8} {'max write':>11}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, (pragmas, transaction_mode) in PROFILES.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self._create_database(path, pragmas, options['users'])
+                result = self._run(path, pragmas, transaction_mode, options)
+                self.stdout.write(
+                    f"{name:>8} {result['writes'] / options['seconds']:>10.0f} "
+                    f"{result['reads'] / options['seconds']:>10.0f} {result['errors']:>8} "
+                    f"{result['max_write'] * 1000:>9.0f}ms"
+                )
+    
+    def _connect(self, path, pragmas):
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, pragmas)
+        return conn
+    
+    def _create_database(self, path, pragmas, users):
+        conn = self._connect(path, pragmas)
+        conn.executescript("""
+            CREATE TABLE user (id INTEGER PRIMARY KEY, total_points INTEGER NOT NULL);
+            CREATE TABLE activity (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES user (id),
+                points INTEGER NOT NULL,
+                logged_at REAL NOT NULL
+            );
+            CREATE INDEX activity_user ON activity (user_id);
+            CREATE INDEX user_points ON user (total_points);
+        """)
+        conn.executemany(
+            'INSERT INTO user (id, total_points) VALUES (?, 0)',
+            [(user_id,) for user_id in range(1, users + 1)]
+        )
+        conn.close()
+    
+    def _run(self, path, pragmas, transaction_mode, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        result = {'writes': 0, 'reads': 0, 'errors': 0, 'max_write': 0.0}
+        
+        def record(**counts):
+            with lock:
+                for key, value in counts.items():
+                    if key == 'max_write':
+                        result[key] = max(result[key], value)
+                    else:
+                        result[key] += value
+        
+        def writer(seed):
+            # Mirrors Activity.save(): read the balance, insert, move the balance
+            rng = random.Random(seed)
+            conn = self._connect(path, pragmas)
+            while not stop.is_set():
+                user_id = rng.randint(1, options['users'])
+                points = rng.randint(5, 100)
+                started = time.perf_counter()
+                try:
+                    conn.execute(f'BEGIN {transaction_mode}')
+                    conn.execute('SELECT total_points FROM user WHERE id = ?', (user_id,)).fetchone()
+                    conn.execute(
+                        'INSERT INTO activity (user_id, points, logged_at) VALUES (?, ?, ?)',
+                        (user_id, points, time.time())
+                    )
+                    conn.execute(
+                        'UPDATE user SET total_points = total_points + ? WHERE id = ?',
+                        (points, user_id)
+                    )
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    record(errors=1)
+                else:
+                    record(writes=1, max_write=time.perf_counter() - started)
+            conn.close()
+        
+        def reader(seed):
+            # A leaderboard page and one user's activity totals
+            rng = random.Random(seed)
+            conn = self._connect(path, pragmas)
+            while not stop.is_set():
+                try:
+                    conn.execute(
+                        'SELECT id, total_points FROM user ORDER BY total_points DESC LIMIT 50'
+                    ).fetchall()
+                    conn.execute(
+                        'SELECT COUNT(*), SUM(points) FROM activity WHERE user_id = ?',
+                        (rng.randint(1, options['users']),)
+                    ).fetchone()
+                except sqlite3.OperationalError:
+                    record(errors=1)
+                else:
+                    record(reads=1)
+            conn.close()
+        
+        threads = [
+            threading.Thread(target=writer, args=(options['seed'] + i,))
+            for i in range(options['writers'])
+        ] + [
+            threading.Thread(target=reader, args=(options['seed'] + 1000 + i,))
+            for i in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return result
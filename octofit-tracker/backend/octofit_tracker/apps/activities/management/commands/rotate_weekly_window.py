@@ -0,0 +1,32 @@
+"""
+Advance the rolling weekly points window.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.activities.models import WeeklyPointsWindow
+
+
+class Command(BaseCommand):
+    help = "Expire daily point buckets that fell out of the rolling weekly window."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Recompute all buckets and weekly totals from activities instead"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        
+        if options['rebuild']:
+            users = WeeklyPointsWindow.rebuild()
+            message = f"Rebuilt weekly windows for {users} users"
+        else:
+            expired = WeeklyPointsWindow.rotate()
+            message = f"Rotated weekly window ({expired} expired buckets removed)"
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"{message} in {elapsed:.2f}s."))
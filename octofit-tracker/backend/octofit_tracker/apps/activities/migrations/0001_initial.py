@@ -0,0 +1,82 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('duration_minutes', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(600)])),
+                ('intensity', models.FloatField(choices=[(0.5, 'Light'), (1.0, 'Moderate'), (1.5, 'Vigorous'), (2.0, 'Very Vigorous')], default=1.0)),
+                ('distance_km', models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)])),
+                ('calories_burned', models.PositiveIntegerField(blank=True, null=True)),
+                ('heart_rate_avg', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(40), django.core.validators.MaxValueValidator(220)])),
+                ('points_earned', models.PositiveIntegerField(default=0)),
+                ('date_logged', models.DateTimeField(auto_now_add=True)),
+                ('activity_date', models.DateTimeField()),
+                ('is_public', models.BooleanField(default=True)),
+                ('notes', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Activities',
+                'ordering': ['-activity_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_url', models.URLField()),
+                ('caption', models.CharField(blank=True, max_length=200)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(choices=[('cardio', 'Cardiovascular'), ('strength', 'Strength Training'), ('flexibility', 'Flexibility'), ('sports', 'Sports'), ('outdoor', 'Outdoor Activities'), ('other', 'Other')], default='other', max_length=20)),
+                ('points_per_minute', models.FloatField(default=1.0, help_text='Base points awarded per minute of activity')),
+                ('difficulty_multiplier', models.FloatField(default=1.0, help_text='Multiplier based on activity difficulty', validators=[django.core.validators.MinValueValidator(0.1), django.core.validators.MaxValueValidator(5.0)])),
+                ('icon', models.CharField(blank=True, max_length=50)),
+                ('color', models.CharField(default='#007bff', max_length=7)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('total_duration_minutes', models.PositiveIntegerField(default=0)),
+                ('total_points', models.PositiveIntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('workout_date', models.DateTimeField()),
+                ('is_template', models.BooleanField(default=False)),
+                ('is_public', models.BooleanField(default=False)),
+                ('activities', models.ManyToManyField(related_name='workout_sessions', to='activities.activity')),
+            ],
+            options={
+                'ordering': ['-workout_date'],
+            },
+        ),
+    ]
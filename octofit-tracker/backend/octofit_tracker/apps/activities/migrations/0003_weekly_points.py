@@ -0,0 +1,46 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('activities', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyPointsWindow',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='weekly_window', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('activities', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPointsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('activities', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_point_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dailypointsbucket',
+            index=models.Index(fields=['day'], name='activities__day_d534f0_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailypointsbucket',
+            unique_together={('user', 'day')},
+        ),
+    ]
@@ -2,11 +2,16 @@
 Activity models for OctoFit Tracker.
 
 This module contains models for activity types, user activities,
-and workout sessions.
+workout sessions and rolling weekly point totals.
 """
-from django.db import models
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import TruncDate
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.utils import timezone
 
 
 class ActivityType(models.Model):
@@ -120,19 +125,96 @@ class Activity(models.Model):
     
     def save(self, *args, **kwargs):
         """Calculate points when saving."""
-        if not self.points_earned:
-            self.points_earned = self.activity_type.calculate_points(
-                self.duration_minutes, 
-                self.intensity
-            )
-        super().save(*args, **kwargs)
+        from octofit_tracker.apps.leaderboard.ranking import record_points
+        from octofit_tracker.apps.leaderboard.tasks import evaluate_activity
+        from octofit_tracker.apps.teams.tasks import enqueue_member_teams
+        from octofit_tracker.apps.users.goals import apply_activity
+        from octofit_tracker.apps.users.points import credit
+        
+        # Points, the weekly window, goals and queued tasks change together or not at all
+        with transaction.atomic():
+            is_new = self._state.adding
+            previous = None
+            if not is_new:
+                previous = Activity.objects.filter(pk=self.pk).values(
+                    'activity_date', 'points_earned', 'duration_minutes', 'activity_type__category'
+                ).first()
+            
+            if not self.points_earned:
+                self.points_earned = self.activity_type.calculate_points(
+                    self.duration_minutes, 
+                    self.intensity
+                )
+            super().save(*args, **kwargs)
+            
+            # Credit the change in points to the user's ledger
+            points_delta = self.points_earned - (previous['points_earned'] if previous else 0)
+            total_points = None
+            if points_delta:
+                total_points = credit(
+                    self.user_id, points_delta, 'activity', self.pk,
+                    description=self.name if is_new else f"Edited: {self.name}"
+                )
+                if Activity.user.is_cached(self):
+                    self.user.total_points = total_points
+            
+            # Keep the rolling weekly window current, noting the change in weekly points
+            weekly_points = 0
+            if previous and (previous['activity_date'], previous['points_earned']) != (self.activity_date, self.points_earned):
+                if WeeklyPointsWindow.apply(self.user_id, previous['activity_date'], -previous['points_earned'], -1):
+                    weekly_points -= previous['points_earned']
+                if WeeklyPointsWindow.apply(self.user_id, self.activity_date, self.points_earned, 1):
+                    weekly_points += self.points_earned
+            elif is_new and WeeklyPointsWindow.apply(self.user_id, self.activity_date, self.points_earned, 1):
+                weekly_points = self.points_earned
+            
+            # Keep this process's ranking indexes current once the write commits
+            if total_points is not None or weekly_points:
+                transaction.on_commit(partial(record_points, self.user_id, total_points, weekly_points))
+            
+            # Advance the user's activity-derived fitness goals
+            category = self.activity_type.category
+            if previous is None:
+                apply_activity(self.user_id, category, self.activity_date, self.duration_minutes)
+            elif (previous['activity_type__category'], previous['activity_date'], previous['duration_minutes']) != (
+                category, self.activity_date, self.duration_minutes
+            ):
+                apply_activity(
+                    self.user_id, previous['activity_type__category'],
+                    previous['activity_date'], -previous['duration_minutes']
+                )
+                apply_activity(self.user_id, category, self.activity_date, self.duration_minutes)
+            
+            # Team totals and achievements are recomputed in the background
+            if points_delta:
+                enqueue_member_teams(self.user_id)
+            if is_new:
+                evaluate_activity.enqueue(self.pk)
+    
+    def delete(self, *args, **kwargs):
+        """Debit the activity's points and remove it from the rolling weekly window and goals."""
+        from octofit_tracker.apps.leaderboard.ranking import record_points
+        from octofit_tracker.apps.teams.tasks import enqueue_member_teams
+        from octofit_tracker.apps.users.goals import apply_activity
+        from octofit_tracker.apps.users.points import credit
         
-        # Update user's total points
-        total_points = self.user.activities.aggregate(
-            total=models.Sum('points_earned')
-        )['total'] or 0
-        self.user.total_points = total_points
-        self.user.save(update_fields=['total_points'])
+        with transaction.atomic():
+            activity_id, user_id = self.pk, self.user_id
+            activity_date, points_earned = self.activity_date, self.points_earned
+            category = self.activity_type.category
+            result = super().delete(*args, **kwargs)
+            weekly_points = 0
+            if WeeklyPointsWindow.apply(user_id, activity_date, -points_earned, -1):
+                weekly_points = -points_earned
+            apply_activity(user_id, category, activity_date, -self.duration_minutes)
+            if points_earned:
+                total_points = credit(
+                    user_id, -points_earned, 'activity', activity_id,
+                    description=f"Deleted: {self.name}"
+                )
+                transaction.on_commit(partial(record_points, user_id, total_points, weekly_points))
+                enqueue_member_teams(user_id)
+        return result
 
 
 class WorkoutSession(models.Model):
@@ -187,4 +269,200 @@ class ActivityPhoto(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"Photo for {self.activity.name}"
\ No newline at end of file
+        return f"Photo for {self.activity.name}"
+
+
+class DailyPointsBucket(models.Model):
+    """
+    Points and activity count a user logged on one day.
+    
+    Buckets only exist for days inside the rolling weekly window; expired
+    buckets are removed when the window rotates.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_point_buckets'
+    )
+    day = models.DateField()
+    points = models.PositiveIntegerField(default=0)
+    activities = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'day']
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.day}: {self.points} points"
+
+
+def _add_counts(model, lookup, points, activities):
+    """
+    Add to a row's points and activities counters, creating the row on first use.
+    
+    A removal with no row to remove from is skipped and returns False. When
+    two first writes race, the loser's INSERT fails on the unique key inside
+    a savepoint and it adds to the winner's row instead.
+    """
+    changes = {
+        'points': models.F('points') + points,
+        'activities': models.F('activities') + activities,
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return True
+    if points < 0 or activities < 0:
+        return False
+    
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, points=points, activities=activities)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
+    return True
+
+
+class WeeklyPointsWindow(models.Model):
+    """
+    Rolling seven-day point totals for a user.
+    
+    The totals are the sum of the user's daily buckets inside the window
+    (today and the previous six days). Logging an activity increments the
+    day's bucket and the totals; rotating the window subtracts buckets that
+    fall out of it. Reading a user's weekly score is a single row lookup.
+    """
+    WINDOW_DAYS = 7
+    
+    # Last day this process rotated the window
+    _rotated_on = None
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='weekly_window'
+    )
+    points = models.PositiveIntegerField(default=0)
+    activities = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.points} points this week"
+    
+    @classmethod
+    def window_start(cls, today=None):
+        """Get the first day inside the rolling window."""
+        today = today or timezone.localdate()
+        return today - timedelta(days=cls.WINDOW_DAYS - 1)
+    
+    @classmethod
+    def window_start_datetime(cls, today=None):
+        """Get the moment the rolling window starts."""
+        return timezone.make_aware(datetime.combine(cls.window_start(today), time.min))
+    
+    @classmethod
+    def apply(cls, user_id, activity_date, points, activities):
+        """
+        Add (or with negative values, remove) an activity's contribution.
+        
+        Returns True if the activity falls inside the window.
+        """
+        cls.rotate_if_due()
+        
+        day = timezone.localdate(activity_date)
+        if not cls.window_start() <= day <= timezone.localdate():
+            return False
+        
+        with transaction.atomic():
+            if not _add_counts(DailyPointsBucket, {'user_id': user_id, 'day': day}, points, activities):
+                return False
+            _add_counts(cls, {'user_id': user_id}, points, activities)
+        
+        return True
+    
+    @classmethod
+    def rotate(cls, today=None):
+        """
+        Advance the window, subtracting buckets that have fallen out of it.
+        
+        Only users with activity on the expired days are touched. Returns the
+        number of expired buckets removed.
+        """
+        start = cls.window_start(today)
+        
+        with transaction.atomic():
+            # Lock the expired buckets so concurrent rotations subtract them once
+            expired = DailyPointsBucket.objects.select_for_update().filter(day__lt=start)
+            if not list(expired.values_list('pk', flat=True)):
+                return 0
+            
+            expired_totals = DailyPointsBucket.objects.filter(
+                user=models.OuterRef('user'),
+                day__lt=start
+            ).values('user')
+            cls.objects.filter(user__in=expired.values('user')).update(
+                points=models.F('points') - models.Subquery(
+                    expired_totals.annotate(total=models.Sum('points')).values('total')
+                ),
+                activities=models.F('activities') - models.Subquery(
+                    expired_totals.annotate(total=models.Sum('activities')).values('total')
+                )
+            )
+            deleted, _ = expired.delete()
+        
+        return deleted
+    
+    @classmethod
+    def rotate_if_due(cls):
+        """Rotate the window once per day in each process."""
+        today = timezone.localdate()
+        if cls._rotated_on != today:
+            cls.rotate(today)
+            cls._rotated_on = today
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute all buckets and totals from activities."""
+        daily = Activity.objects.filter(
+            activity_date__gte=cls.window_start_datetime()
+        ).annotate(
+            day=TruncDate('activity_date')
+        ).values('user', 'day').annotate(
+            total_points=models.Sum('points_earned'),
+            total_activities=models.Count('id')
+        ).order_by()
+        
+        buckets = [
+            DailyPointsBucket(
+                user_id=row['user'],
+                day=row['day'],
+                points=row['total_points'] or 0,
+                activities=row['total_activities']
+            )
+            for row in daily
+        ]
+        
+        totals = {}
+        for bucket in buckets:
+            points, activities = totals.get(bucket.user_id, (0, 0))
+            totals[bucket.user_id] = (points + bucket.points, activities + bucket.activities)
+        
+        with transaction.atomic():
+            DailyPointsBucket.objects.all().delete()
+            cls.objects.all().delete()
+            DailyPointsBucket.objects.bulk_create(buckets, batch_size=1000)
+            cls.objects.bulk_create([
+                cls(user_id=user_id, points=points, activities=activities)
+                for user_id, (points, activities) in totals.items()
+            ], batch_size=1000)
+        
+        cls._rotated_on = timezone.localdate()
+        return len(totals)
+    
+    @classmethod
+    def totals_for(cls, user_id):
+        """Get a user's (points, activities) for the rolling week."""
+        cls.rotate_if_due()
+        window = cls.objects.filter(user_id=user_id).values_list('points', 'activities').first()
+        return window or (0, 0)
@@ -0,0 +1,130 @@
+"""
+Tests for activities.
+
+Activity writes keep the rolling weekly window (daily buckets and per-user
+totals) current incrementally; rotating or rebuilding it must agree.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from octofit_tracker.apps.leaderboard.ranking import get_ranking_index, reset_ranking_indexes
+from octofit_tracker.apps.users.models import User, UserProfile
+
+from .models import Activity, ActivityType, DailyPointsBucket, WeeklyPointsWindow
+
+
+class WeeklyPointsWindowTests(TestCase):
+    """The weekly window through activity creates, edits and deletes."""
+    
+    def setUp(self):
+        self.user = User.objects.create(username='runner', email='runner@example.com')
+        UserProfile.objects.create(user=self.user)
+        # One point per minute
+        self.activity_type = ActivityType.objects.create(name='Running', category='cardio')
+        self.today = timezone.localdate()
+        WeeklyPointsWindow._rotated_on = None
+        reset_ranking_indexes()
+        self.addCleanup(reset_ranking_indexes)
+    
+    def log(self, days_ago, minutes):
+        return Activity.objects.create(
+            user=self.user,
+            activity_type=self.activity_type,
+            name='Run',
+            duration_minutes=minutes,
+            activity_date=timezone.now() - timedelta(days=days_ago)
+        )
+    
+    def move(self, activity, days_ago):
+        activity.activity_date = timezone.now() - timedelta(days=days_ago)
+        activity.save()
+    
+    def totals(self):
+        return WeeklyPointsWindow.totals_for(self.user.pk)
+    
+    def buckets(self):
+        """Non-empty daily buckets as {days ago: points}."""
+        return {
+            (self.today - day).days: points
+            for day, points in DailyPointsBucket.objects.filter(
+                user=self.user, activities__gt=0
+            ).values_list('day', 'points')
+        }
+    
+    def test_create_adds_inside_the_window_only(self):
+        self.log(0, 30)
+        self.log(2, 20)
+        self.log(9, 50)
+        self.assertEqual(self.totals(), (50, 2))
+        self.assertEqual(self.buckets(), {0: 30, 2: 20})
+    
+    def test_edit_moves_points_across_days(self):
+        activity = self.log(1, 30)
+        self.move(activity, 3)
+        self.assertEqual(self.totals(), (30, 1))
+        self.assertEqual(self.buckets(), {3: 30})
+        
+        self.move(activity, 10)
+        self.assertEqual(self.totals(), (0, 0))
+        self.assertEqual(self.buckets(), {})
+        
+        self.move(activity, 0)
+        activity.points_earned = 45
+        activity.save()
+        self.assertEqual(self.totals(), (45, 1))
+        self.assertEqual(self.buckets(), {0: 45})
+    
+    def test_delete_removes_points(self):
+        self.log(0, 10)
+        self.log(1, 30).delete()
+        self.assertEqual(self.totals(), (10, 1))
+        self.assertEqual(self.buckets(), {0: 10})
+        
+        # Activities outside the window have nothing to remove
+        self.log(12, 30).delete()
+        self.assertEqual(self.totals(), (10, 1))
+        self.assertFalse(DailyPointsBucket.objects.filter(points__lt=0).exists())
+    
+    def test_weekly_ranking_index_follows_edits_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.log(0, 30)
+            second = self.log(1, 20)
+        get_ranking_index('overall')
+        weekly = get_ranking_index('weekly')
+        self.assertEqual(weekly.score_of(self.user.pk), 50)
+        
+        # Moving an activity out of the window keeps the user's total points
+        with self.captureOnCommitCallbacks(execute=True):
+            self.move(first, 10)
+        self.assertEqual(weekly.score_of(self.user.pk), 20)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(weekly.score_of(self.user.pk), 0)
+    
+    def test_rotate_subtracts_expired_days(self):
+        self.log(0, 30)
+        self.log(5, 20)
+        
+        # Two days on, the window starts four days ago
+        self.assertEqual(WeeklyPointsWindow.rotate(self.today + timedelta(days=2)), 1)
+        self.assertEqual(self.totals(), (30, 1))
+        self.assertEqual(self.buckets(), {0: 30})
+        self.assertEqual(WeeklyPointsWindow.rotate(self.today + timedelta(days=2)), 0)
+        self.assertEqual(self.totals(), (30, 1))
+    
+    def test_rebuild_matches_incremental_updates(self):
+        kept = self.log(0, 30)
+        moved = self.log(2, 20)
+        self.log(4, 15).delete()
+        self.log(9, 50)
+        self.move(moved, 5)
+        kept.points_earned = 40
+        kept.save()
+        incremental = (self.totals(), self.buckets())
+        
+        WeeklyPointsWindow.rebuild()
+        self.assertEqual((self.totals(), self.buckets()), incremental)
+        self.assertEqual(incremental, ((60, 2), {0: 40, 5: 20}))
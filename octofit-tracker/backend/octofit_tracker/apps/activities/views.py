@@ -3,12 +3,15 @@ Views for activity-related endpoints.
 """
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from django.db import models
 from django.db.models import Sum, Avg, Count
 from django.utils import timezone
-from datetime import timedelta
 
-from .models import ActivityType, Activity, WorkoutSession
+from octofit_tracker.db.replica import ReplicaReadMixin
+
+from .models import ActivityType, Activity, WorkoutSession, WeeklyPointsWindow
 from .serializers import (
     ActivityTypeSerializer, ActivitySerializer, ActivityCreateSerializer,
     WorkoutSessionSerializer, ActivitySummarySerializer
@@ -22,10 +25,11 @@ class ActivityTypeViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """ViewSet for activity management."""
     serializer_class = ActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = {'summary'}
     
     def get_queryset(self):
         """Filter activities based on user and privacy settings."""
@@ -111,11 +115,7 @@ class ActivityViewSet(viewsets.ModelViewSet):
         ).order_by('-count').first()
         
         # This week's statistics
-        week_start = timezone.now() - timedelta(days=7)
-        this_week = activities.filter(activity_date__gte=week_start).aggregate(
-            week_activities=Count('id'),
-            week_points=Sum('points_earned')
-        )
+        week_points, week_activities = WeeklyPointsWindow.totals_for(user.id)
         
         summary_data = {
             'total_activities': total_stats['total_activities'] or 0,
@@ -123,8 +123,8 @@ class ActivityViewSet(viewsets.ModelViewSet):
             'total_points': total_stats['total_points'] or 0,
             'average_intensity': round(total_stats['avg_intensity'] or 0, 2),
             'most_common_activity': most_common['activity_type__name'] if most_common else 'None',
-            'this_week_activities': this_week['week_activities'] or 0,
-            'this_week_points': this_week['week_points'] or 0,
+            'this_week_activities': week_activities,
+            'this_week_points': week_points,
         }
         
         serializer = ActivitySummarySerializer(data=summary_data)
@@ -0,0 +1,414 @@
+"""
+Achievement evaluation for OctoFit Tracker.
+
+After each write that changes a user's counters, the engine compares the
+counters before and after the write against the active achievement
+catalog. Thresholds are kept sorted per (achievement_type, activity type)
+so newly crossed achievements are found with two binary searches, and the
+cost of one evaluation does not grow with the size of the catalog.
+
+Counters:
+    points       points earned from activities (of the required type, if set)
+    activities   number of activities logged (of the required type, if set)
+    consistency  number of distinct days with an activity (of the required type, if set)
+    challenge    number of completed weekly challenges
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Achievement, UserAchievement
+
+
+ACTIVITY_COUNTERS = ('points', 'activities', 'consistency')
+
+
+class AchievementCatalog:
+    """Active achievements indexed by counter key with sorted thresholds."""
+    
+    def __init__(self, achievements):
+        self._thresholds = {}
+        self._repeatable = {}
+        
+        for achievement in sorted(achievements, key=lambda a: a.required_value):
+            key = (achievement.achievement_type, achievement.required_activity_type_id)
+            if achievement.is_repeatable:
+                self._repeatable.setdefault(key, []).append(achievement)
+            else:
+                values, items = self._thresholds.setdefault(key, ([], []))
+                values.append(achievement.required_value)
+                items.append(achievement)
+        
+        self.keys = set(self._thresholds) | set(self._repeatable)
+        self.built_at = time.monotonic()
+    
+    def activity_type_ids(self, achievement_type):
+        """Get the activity types with achievements of a given type."""
+        return {
+            activity_type_id for kind, activity_type_id in self.keys
+            if kind == achievement_type and activity_type_id is not None
+        }
+    
+    def crossed(self, key, old_value, new_value):
+        """
+        Get achievements whose threshold lies in (old_value, new_value].
+        
+        Repeatable achievements are earned again at every multiple of their
+        required value.
+        """
+        if new_value <= old_value:
+            return []
+        
+        values, items = self._thresholds.get(key, ((), ()))
+        crossed = list(items[bisect_right(values, old_value):bisect_right(values, new_value)])
+        
+        for achievement in self._repeatable.get(key, ()):
+            step = achievement.required_value
+            if step > 0 and new_value // step > old_value // step:
+                crossed.append(achievement)
+        
+        return crossed
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Get this process's achievement catalog.
+    
+    The catalog is rebuilt once it is older than ACHIEVEMENT_CATALOG_TTL
+    seconds, or immediately after invalidate_catalog().
+    """
+    global _catalog
+    ttl = getattr(settings, 'ACHIEVEMENT_CATALOG_TTL', 60)
+    catalog = _catalog
+    if catalog is None or time.monotonic() - catalog.built_at > ttl:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or time.monotonic() - catalog.built_at > ttl:
+                catalog = AchievementCatalog(Achievement.objects.filter(is_active=True))
+                _catalog = catalog
+    return catalog
+
+
+def invalidate_catalog():
+    """Rebuild the catalog on next use."""
+    global _catalog
+    _catalog = None
+
+
+def get_activity_counters(activity, catalog):
+    """
+    Get (old, new) counter values around a newly logged activity.
+    
+    All counters come from one conditional aggregate over the user's
+    activities up to and including this one, so the result does not depend
+    on when the evaluation runs; the old values subtract the new activity's
+    contribution.
+    """
+    from octofit_tracker.apps.activities.models import Activity
+    
+    day = TruncDate('activity_date')
+    activity_day = timezone.localdate(activity.activity_date)
+    aggregates = {
+        'points': models.Sum('points_earned'),
+        'activities': models.Count('id'),
+        'consistency': models.Count(day, distinct=True),
+        'same_day': models.Count('id', filter=models.Q(activity_date__date=activity_day)),
+    }
+    type_id = activity.activity_type_id
+    typed = any(
+        type_id in catalog.activity_type_ids(kind) for kind in ACTIVITY_COUNTERS
+    )
+    if typed:
+        of_type = models.Q(activity_type_id=type_id)
+        aggregates.update({
+            'typed_points': models.Sum('points_earned', filter=of_type),
+            'typed_activities': models.Count('id', filter=of_type),
+            'typed_consistency': models.Count(day, filter=of_type, distinct=True),
+            'typed_same_day': models.Count(
+                'id', filter=of_type & models.Q(activity_date__date=activity_day)
+            ),
+        })
+    
+    totals = Activity.objects.filter(
+        user_id=activity.user_id, pk__lte=activity.pk
+    ).aggregate(**aggregates)
+    
+    counters = {}
+    for prefix, activity_type_id in [('', None)] + ([('typed_', type_id)] if typed else []):
+        new_day = 1 if totals[f'{prefix}same_day'] == 1 else 0
+        new_values = {
+            'points': totals[f'{prefix}points'] or 0,
+            'activities': totals[f'{prefix}activities'],
+            'consistency': totals[f'{prefix}consistency'],
+        }
+        contributions = {
+            'points': activity.points_earned,
+            'activities': 1,
+            'consistency': new_day,
+        }
+        for kind in ACTIVITY_COUNTERS:
+            counters[(kind, activity_type_id)] = (
+                new_values[kind] - contributions[kind], new_values[kind]
+            )
+    return counters
+
+
+def award_achievements(user, crossed, related_activity=None):
+    """
+    Award crossed achievements in bulk.
+    
+    `crossed` is a list of (achievement, progress_value). Non-repeatable
+    achievements the user already holds are skipped, and so are achievements
+    already awarded for related_activity, so evaluating an activity again
+    (e.g. a retried task) awards nothing twice. Bonus points are credited
+    through the points ledger. Returns the created UserAchievement rows.
+    """
+    from .ranking import record_points
+    
+    if not crossed:
+        return []
+    
+    once = [achievement.id for achievement, _ in crossed if not achievement.is_repeatable]
+    held = models.Q(achievement_id__in=once)
+    if related_activity is not None:
+        held |= models.Q(related_activity=related_activity)
+    earned = set(
+        UserAchievement.objects.filter(held, user=user).values_list('achievement_id', flat=True)
+    ) if once or related_activity is not None else set()
+    
+    awards = [
+        UserAchievement(
+            user=user,
+            achievement=achievement,
+            progress_value=progress_value,
+            related_activity=related_activity
+        )
+        for achievement, progress_value in crossed
+        if achievement.id not in earned
+    ]
+    if not awards:
+        return []
+    
+    balances = save_awards(awards)
+    if user.pk in balances:
+        user.total_points = balances[user.pk]
+        record_points(user.pk, user.total_points)
+    
+    return awards
+
+
+def get_bonus_entries(awards):
+    """Build points ledger entries for the bonus points of saved awards."""
+    from octofit_tracker.apps.users.models import PointsLedgerEntry
+    
+    return [
+        PointsLedgerEntry(
+            user_id=award.user_id,
+            source_type='achievement',
+            source_id=award.pk,
+            points=award.achievement.points_reward,
+            description=f"Earned {award.achievement.name}"[:200]
+        )
+        for award in awards if award.achievement.points_reward
+    ]
+
+
+def evaluate_activity(activity):
+    """Award achievements newly earned by logging an activity."""
+    catalog = get_catalog()
+    if not any(kind in ACTIVITY_COUNTERS for kind, _ in catalog.keys):
+        return []
+    
+    crossed = []
+    for key, (old_value, new_value) in get_activity_counters(activity, catalog).items():
+        for achievement in catalog.crossed(key, old_value, new_value):
+            crossed.append((achievement, new_value))
+    
+    return award_achievements(activity.user, crossed, related_activity=activity)
+
+
+def evaluate_challenge_completion(user):
+    """Award achievements newly earned by completing a weekly challenge."""
+    from .models import WeeklyChallengeParticipation
+    
+    catalog = get_catalog()
+    if ('challenge', None) not in catalog.keys:
+        return []
+    
+    completed = WeeklyChallengeParticipation.objects.filter(user=user, is_completed=True).count()
+    crossed = [
+        (achievement, completed)
+        for achievement in catalog.crossed(('challenge', None), completed - 1, completed)
+    ]
+    return award_achievements(user, crossed)
+
+
+def evaluate_challenge_completions(user_ids):
+    """
+    Award challenge achievements to many users who just completed a challenge.
+    
+    Completion counts come from one grouped query and held achievements
+    from one lookup, so the cost does not grow with the number of users.
+    Returns the number of awards.
+    """
+    from .models import WeeklyChallengeParticipation
+    
+    catalog = get_catalog()
+    if not user_ids or ('challenge', None) not in catalog.keys:
+        return 0
+    
+    completed_counts = list(WeeklyChallengeParticipation.objects.filter(
+        user_id__in=user_ids, is_completed=True
+    ).values('user_id').annotate(completed=models.Count('id')).values_list('user_id', 'completed'))
+    
+    crossed = {
+        user_id: catalog.crossed(('challenge', None), completed - 1, completed)
+        for user_id, completed in completed_counts
+    }
+    once = {
+        achievement.id
+        for achievements in crossed.values()
+        for achievement in achievements if not achievement.is_repeatable
+    }
+    earned = set(
+        UserAchievement.objects.filter(
+            user_id__in=user_ids, achievement_id__in=once
+        ).values_list('user_id', 'achievement_id')
+    ) if once else set()
+    
+    awards = []
+    for user_id, completed in completed_counts:
+        for achievement in crossed[user_id]:
+            if achievement.is_repeatable or (user_id, achievement.id) not in earned:
+                awards.append(UserAchievement(
+                    user_id=user_id,
+                    achievement=achievement,
+                    progress_value=completed
+                ))
+    
+    save_awards(awards)
+    return len(awards)
+
+
+class ActivityReplay:
+    """
+    Replays one user's activities in date order, tracking counters in memory.
+    
+    Used to award achievements retroactively with the same counter rules as
+    the online engine.
+    """
+    
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.typed_ids = set().union(
+            *(catalog.activity_type_ids(kind) for kind in ACTIVITY_COUNTERS)
+        )
+        self.points = defaultdict(int)
+        self.activities = defaultdict(int)
+        self.days = defaultdict(set)
+    
+    def apply(self, activity_type_id, activity_date, points_earned):
+        """Apply one activity and return the (achievement, progress_value) crossed."""
+        day = timezone.localdate(activity_date)
+        crossed = []
+        
+        type_keys = [None]
+        if activity_type_id in self.typed_ids:
+            type_keys.append(activity_type_id)
+        
+        for type_key in type_keys:
+            days = self.days[type_key]
+            changes = {
+                'points': (self.points[type_key], self.points[type_key] + points_earned),
+                'activities': (self.activities[type_key], self.activities[type_key] + 1),
+                'consistency': (len(days), len(days) + (day not in days)),
+            }
+            self.points[type_key] += points_earned
+            self.activities[type_key] += 1
+            days.add(day)
+            
+            for kind, (old_value, new_value) in changes.items():
+                crossed.extend(
+                    (achievement, new_value)
+                    for achievement in self.catalog.crossed((kind, type_key), old_value, new_value)
+                )
+        
+        return crossed
+
+
+def backfill_user_range(first_user_id, last_user_id, achievement_ids=None, chunk_size=2000):
+    """
+    Award activity achievements retroactively to users in an ID range.
+    
+    Activities are streamed in (user, date) order with a server-side
+    iterator and replayed per user in memory. Awards already held are
+    skipped (for repeatable achievements, the first N occurrences are), so
+    re-running a range is safe. Awards and bonus points for the range are
+    written in one transaction. Returns (users, awards, bonus_points).
+    """
+    from octofit_tracker.apps.activities.models import Activity
+    
+    achievements = Achievement.objects.filter(
+        is_active=True, achievement_type__in=ACTIVITY_COUNTERS
+    )
+    if achievement_ids:
+        achievements = achievements.filter(id__in=achievement_ids)
+    catalog = AchievementCatalog(achievements)
+    if not catalog.keys:
+        return 0, 0, 0
+    
+    in_range = {'user_id__gte': first_user_id, 'user_id__lte': last_user_id}
+    already_earned = Counter({
+        (row['user_id'], row['achievement_id']): row['earned']
+        for row in UserAchievement.objects.filter(
+            achievement__in=achievements, **in_range
+        ).values('user_id', 'achievement_id').annotate(earned=models.Count('id'))
+    })
+    
+    activities = Activity.objects.filter(**in_range).order_by(
+        'user_id', 'activity_date', 'id'
+    ).values_list(
+        'id', 'user_id', 'activity_type_id', 'activity_date', 'points_earned'
+    ).iterator(chunk_size=chunk_size)
+    
+    users = 0
+    awards = []
+    for user_id, user_activities in groupby(activities, key=lambda row: row[1]):
+        users += 1
+        replay = ActivityReplay(catalog)
+        for activity_id, _, activity_type_id, activity_date, points_earned in user_activities:
+            for achievement, progress_value in replay.apply(activity_type_id, activity_date, points_earned):
+                key = (user_id, achievement.id)
+                if already_earned[key] > 0:
+                    # Skip occurrences the user already holds
+                    already_earned[key] -= 1
+                    continue
+                awards.append(UserAchievement(
+                    user_id=user_id,
+                    achievement=achievement,
+                    progress_value=progress_value,
+                    related_activity_id=activity_id
+                ))
+    
+    save_awards(awards, batch_size=chunk_size)
+    return users, len(awards), sum(award.achievement.points_reward for award in awards)
+
+
+def save_awards(awards, batch_size=2000):
+    """Insert awards for many users and credit their bonus points in bulk."""
+    from octofit_tracker.apps.users.points import credit_many
+    
+    with transaction.atomic():
+        UserAchievement.objects.bulk_create(awards, batch_size=batch_size)
+        return credit_many(get_bonus_entries(awards), batch_size=batch_size)
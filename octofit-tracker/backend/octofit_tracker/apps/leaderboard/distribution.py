@@ -0,0 +1,91 @@
+"""
+Score distributions for OctoFit Tracker.
+
+Each worker process keeps a compact NumPy array of the sorted scores for
+a leaderboard type, copied from the in-memory ranking index and refreshed
+after LEADERBOARD_DISTRIBUTION_TTL seconds. Histograms, percentiles and a
+user's percentile are all computed from that one array, so no request
+reads every user's score from the database.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .ranking import get_ranking_index
+
+
+# Leaderboard types with a score distribution
+DISTRIBUTION_TYPES = ('overall', 'weekly')
+
+# Percentiles reported for every distribution
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+class ScoreDistribution:
+    """Sorted scores of one leaderboard as a float64 array."""
+    
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.built_at = time.monotonic()
+    
+    def __len__(self):
+        return len(self.scores)
+    
+    def summary(self):
+        """Get count, min, max, mean and the standard percentiles."""
+        if not len(self.scores):
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'percentiles': {}}
+        
+        values = np.percentile(self.scores, PERCENTILES)
+        return {
+            'count': len(self.scores),
+            'min': float(self.scores[0]),
+            'max': float(self.scores[-1]),
+            'mean': round(float(self.scores.mean()), 2),
+            'percentiles': {
+                f'p{percentile}': round(float(value), 2) for percentile, value in zip(PERCENTILES, values)
+            },
+        }
+    
+    def histogram(self, bins=10):
+        """Get equal-width histogram buckets over the score range."""
+        if not len(self.scores):
+            return []
+        
+        counts, edges = np.histogram(self.scores, bins=bins)
+        return [
+            {'min': round(float(low), 2), 'max': round(float(high), 2), 'count': int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ]
+    
+    def percentile_of(self, score):
+        """Get the percentage of ranked users with a lower score."""
+        if not len(self.scores):
+            return None
+        below = np.searchsorted(self.scores, score, side='left')
+        return round(100.0 * below / len(self.scores), 1)
+
+
+_distributions = {}
+_distributions_lock = threading.Lock()
+
+
+def get_score_distribution(leaderboard_type):
+    """
+    Get this process's score distribution for a leaderboard type.
+    
+    The array is copied from the ranking index on first use and refreshed
+    once it is older than LEADERBOARD_DISTRIBUTION_TTL seconds.
+    """
+    ttl = getattr(settings, 'LEADERBOARD_DISTRIBUTION_TTL', 60)
+    distribution = _distributions.get(leaderboard_type)
+    if distribution is None or time.monotonic() - distribution.built_at > ttl:
+        with _distributions_lock:
+            distribution = _distributions.get(leaderboard_type)
+            if distribution is None or time.monotonic() - distribution.built_at > ttl:
+                index = get_ranking_index(leaderboard_type)
+                distribution = ScoreDistribution(index.sorted_scores())
+                _distributions[leaderboard_type] = distribution
+    return distribution
@@ -0,0 +1,125 @@
+"""
+Award achievements retroactively from historical activities.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max, Min
+
+from octofit_tracker.apps.activities.models import Activity
+from octofit_tracker.apps.leaderboard.achievements import backfill_user_range
+
+
+def _init_worker():
+    """Set up Django in a worker process."""
+    import django
+    django.setup()
+
+
+def _run_range(first_user_id, last_user_id, achievement_ids, chunk_size):
+    result = backfill_user_range(first_user_id, last_user_id, achievement_ids, chunk_size)
+    connections.close_all()
+    return first_user_id, last_user_id, result
+
+
+class Command(BaseCommand):
+    help = "Replay historical activities per user and award achievements they have earned."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--achievement',
+            action='append',
+            type=int,
+            dest='achievement_ids',
+            help="Achievement ID to backfill (repeatable, default: all active activity achievements)"
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Number of worker processes (default: 1)"
+        )
+        parser.add_argument(
+            '--range-size',
+            type=int,
+            default=1000,
+            help="Number of user IDs per unit of work (default: 1000)"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help="Rows fetched per round trip and inserted per batch (default: 2000)"
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help="JSON file recording completed user ID ranges; completed ranges are skipped on resume"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        checkpoint = options['checkpoint']
+        
+        completed = set()
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                completed = {tuple(r) for r in json.load(f)['completed']}
+        
+        bounds = Activity.objects.aggregate(first=Min('user_id'), last=Max('user_id'))
+        if bounds['first'] is None:
+            self.stdout.write("No activities to replay.")
+            return
+        
+        range_size = options['range_size']
+        ranges = [
+            (first, min(first + range_size - 1, bounds['last']))
+            for first in range(bounds['first'], bounds['last'] + 1, range_size)
+        ]
+        pending = [r for r in ranges if r not in completed]
+        self.stdout.write(
+            f"{len(pending)} of {len(ranges)} user ID ranges to process "
+            f"with {options['workers']} worker(s)."
+        )
+        
+        totals = {'users': 0, 'awards': 0, 'bonus': 0}
+        
+        def record(first_user_id, last_user_id, result):
+            users, awards, bonus = result
+            totals['users'] += users
+            totals['awards'] += awards
+            totals['bonus'] += bonus
+            completed.add((first_user_id, last_user_id))
+            if checkpoint:
+                self._write_checkpoint(checkpoint, completed)
+            self.stdout.write(
+                f"Users {first_user_id}-{last_user_id}: {users} users, {awards} awards"
+            )
+        
+        args = (options['achievement_ids'], options['chunk_size'])
+        if options['workers'] > 1:
+            # Workers must open their own database connections
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers'], initializer=_init_worker) as pool:
+                futures = [pool.submit(_run_range, first, last, *args) for first, last in pending]
+                for future in as_completed(futures):
+                    record(*future.result())
+        else:
+            for first, last in pending:
+                record(first, last, backfill_user_range(first, last, *args))
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {totals['awards']} achievements ({totals['bonus']} bonus points) "
+            f"for {totals['users']} users in {elapsed:.2f}s."
+        ))
+    
+    def _write_checkpoint(self, path, completed):
+        """Write the checkpoint atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'completed': sorted(completed)}, f)
+        os.replace(temp_path, path)
@@ -0,0 +1,57 @@
+"""
+Benchmark the in-memory ranking index.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.leaderboard.ranking import RankingIndex
+
+
+class Command(BaseCommand):
+    help = "Measure build, rank lookup and update times of the ranking index on synthetic scores."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[10_000, 100_000, 1_000_000],
+            help="Numbers of users to benchmark (default: 10k 100k 1M)"
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=100_000,
+            help="Number of lookups and updates timed per size (default: 100000)"
+        )
+        parser.add_argument('--seed', type=int, default=42)
+    
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        operations = options['operations']
+        
+        self.stdout.write(f"{'users':>10} {'build':>10} {'rank_of':>12} {'add_points':>12}")
+        for size in options['sizes']:
+            scores = {user_id: rng.randint(0, 50_000) for user_id in range(1, size + 1)}
+            user_ids = [rng.randint(1, size) for _ in range(operations)]
+            deltas = [rng.randint(1, 300) for _ in range(operations)]
+            
+            started = time.perf_counter()
+            index = RankingIndex(scores)
+            build_seconds = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            for user_id in user_ids:
+                index.rank_of(user_id)
+            lookup_us = (time.perf_counter() - started) / operations * 1e6
+            
+            started = time.perf_counter()
+            for user_id, delta in zip(user_ids, deltas):
+                index.add_points(user_id, delta)
+            update_us = (time.perf_counter() - started) / operations * 1e6
+            
+            self.stdout.write(
+                f"{size:>10} {build_seconds:>9.2f}s {lookup_us:>10.2f}us {update_us:>10.2f}us"
+            )
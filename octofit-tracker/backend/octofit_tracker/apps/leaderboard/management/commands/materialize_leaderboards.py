@@ -0,0 +1,54 @@
+"""
+Materialize leaderboard rankings into LeaderboardEntry.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.leaderboard.materialize import (
+    PARTITION_SCHEMES, PERIOD_LENGTHS, materialize_all, prune_snapshots
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute all leaderboard types and swap in the new rankings atomically."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            action='append',
+            dest='leaderboard_types',
+            choices=list(PERIOD_LENGTHS),
+            help="Leaderboard type to materialize (repeatable, default: all)"
+        )
+        parser.add_argument(
+            '--partition',
+            action='append',
+            dest='partition_schemes',
+            choices=list(PARTITION_SCHEMES),
+            help="Partition scheme to rank within (repeatable, default: LEADERBOARD_PARTITION_SCHEMES)"
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=None,
+            help="Delete rank snapshots older than this (default: LEADERBOARD_SNAPSHOT_RETENTION_DAYS)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = materialize_all(
+            options['leaderboard_types'],
+            partition_schemes=options['partition_schemes']
+        )
+        pruned = prune_snapshots(options['retention_days'])
+        elapsed = time.monotonic() - started
+        
+        for (leaderboard_type, partition_by), count in counts.items():
+            scope = f" by {partition_by}" if partition_by else ""
+            self.stdout.write(f"{leaderboard_type}{scope}: {count} entries")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {len(counts)} leaderboards in {elapsed:.2f}s "
+            f"({pruned} expired rank snapshots pruned)."
+        ))
@@ -0,0 +1,48 @@
+"""
+Refresh weekly challenge progress for all participants.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from octofit_tracker.apps.leaderboard.models import WeeklyChallenge
+
+
+class Command(BaseCommand):
+    help = "Recompute progress and completions for every participant of current weekly challenges."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--challenge',
+            action='append',
+            type=int,
+            dest='challenge_ids',
+            help="Weekly challenge ID to refresh (repeatable, default: active challenges of the current week)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of participations written per batch (default: 1000)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        
+        if options['challenge_ids']:
+            challenges = WeeklyChallenge.objects.filter(id__in=options['challenge_ids'])
+        else:
+            now = timezone.now()
+            challenges = WeeklyChallenge.objects.filter(
+                is_active=True, week_start__lte=now, week_end__gte=now
+            )
+        
+        for challenge in challenges:
+            updated, completed = challenge.refresh_progress(batch_size=options['batch_size'])
+            self.stdout.write(f"{challenge}: {updated} updated, {completed} completed")
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {len(challenges)} challenges in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,281 @@
+"""
+Leaderboard materialization for OctoFit Tracker.
+
+This module computes rankings for every leaderboard type with set-based
+SQL and swaps them into LeaderboardEntry atomically, so read endpoints
+can serve precomputed rows instead of aggregating raw tables.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import CharField, Count, F, Sum, Value, Window
+from django.db.models.functions import Cast, Concat, Rank, TruncDate
+from django.utils import timezone
+
+from .models import LeaderboardEntry, RankSnapshot
+
+
+# Length of the rolling window for each leaderboard type (None = all time)
+PERIOD_LENGTHS = {
+    'overall': None,
+    'weekly': timedelta(days=7),
+    'monthly': timedelta(days=30),
+    'activities': None,
+    'duration': None,
+    'consistency': timedelta(days=30),
+}
+
+# How far back change_from_last_period looks for each leaderboard type
+CHANGE_INTERVALS = {
+    leaderboard_type: length or timedelta(days=7)
+    for leaderboard_type, length in PERIOD_LENGTHS.items()
+}
+
+# Period start recorded for all-time leaderboards
+ALL_TIME_START = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Partition schemes: user field path holding the partition value, and the
+# filter a user must match to be ranked in that scheme
+PARTITION_SCHEMES = {
+    'grade': ('grade_level', {'grade_level__gt': ''}),
+    'team': ('team_memberships__team_id', {'team_memberships__is_active': True}),
+}
+
+
+def partition_key(partition_by, value):
+    """Get the stored partition key for a scheme and value, e.g. 'grade:9'."""
+    return f'{partition_by}:{value}'
+
+
+def get_partition_expression(partition_by, user_path=''):
+    """Build the SQL expression producing partition keys for a scheme."""
+    field, _ = PARTITION_SCHEMES[partition_by]
+    return Concat(
+        Value(f'{partition_by}:'),
+        Cast(F(f'{user_path}{field}'), output_field=CharField()),
+        output_field=CharField()
+    )
+
+
+def get_period_bounds(leaderboard_type, now=None):
+    """Get the (period_start, period_end) covered by a leaderboard type."""
+    from octofit_tracker.apps.activities.models import WeeklyPointsWindow
+    
+    now = now or timezone.now()
+    if leaderboard_type == 'weekly':
+        # Weekly scores come from the rolling window of whole days
+        return WeeklyPointsWindow.window_start_datetime(timezone.localdate(now)), now
+    
+    length = PERIOD_LENGTHS[leaderboard_type]
+    period_start = now - length if length else ALL_TIME_START
+    return period_start, now
+
+
+def get_score_queryset(leaderboard_type, period_start, period_end, partition_by=None):
+    """
+    Build the per-user score query for a leaderboard type.
+    
+    Only users with public profiles are ranked. The overall leaderboard
+    ranks every public user by total points, the weekly leaderboard reads
+    the rolling weekly window, and the remaining types rank users with at
+    least one activity in the period.
+    
+    With partition_by, rows also carry a partition_key and a user appears
+    once per partition (e.g. once per active team membership).
+    """
+    from octofit_tracker.apps.activities.models import Activity, WeeklyPointsWindow
+    
+    if leaderboard_type == 'overall':
+        User = get_user_model()
+        user_path = ''
+        rows = User.objects.filter(profile__is_profile_public=True)
+        user_id = F('id')
+    elif leaderboard_type == 'weekly':
+        WeeklyPointsWindow.rotate_if_due()
+        user_path = 'user__'
+        rows = WeeklyPointsWindow.objects.filter(
+            user__profile__is_profile_public=True,
+            activities__gt=0
+        )
+        user_id = F('user')
+    else:
+        user_path = 'user__'
+        rows = Activity.objects.filter(user__profile__is_profile_public=True)
+        user_id = F('user')
+        if PERIOD_LENGTHS[leaderboard_type]:
+            rows = rows.filter(
+                activity_date__gte=period_start,
+                activity_date__lte=period_end
+            )
+    
+    group_by = {'entry_user_id': user_id}
+    if partition_by:
+        _, user_filter = PARTITION_SCHEMES[partition_by]
+        rows = rows.filter(**{f'{user_path}{key}': value for key, value in user_filter.items()})
+        group_by['partition_key'] = get_partition_expression(partition_by, user_path)
+    rows = rows.values(**group_by)
+    
+    if leaderboard_type == 'overall':
+        score = F('total_points')
+    elif leaderboard_type == 'weekly':
+        score = F('points')
+    elif leaderboard_type == 'monthly':
+        score = Sum('points_earned')
+    elif leaderboard_type == 'activities':
+        score = Count('id')
+    elif leaderboard_type == 'duration':
+        score = Sum('duration_minutes')
+    elif leaderboard_type == 'consistency':
+        # Number of distinct days with at least one activity
+        score = Count(TruncDate('activity_date'), distinct=True)
+    else:
+        raise ValueError(f"Unknown leaderboard type: {leaderboard_type}")
+    
+    return rows.annotate(score=score).order_by()
+
+
+def materialize_leaderboard(leaderboard_type, now=None, partition_by=None):
+    """
+    Recompute one leaderboard type and swap it in atomically.
+    
+    Scores and ranks are produced by a single INSERT ... SELECT using
+    RANK() OVER, so rows never pass through Python. With partition_by,
+    ranks for every partition of the scheme (every grade level or every
+    team) come from the same statement via RANK() OVER (PARTITION BY ...).
+    The previous rows are replaced inside the same transaction, which means
+    readers always see either the old or the new snapshot. Returns the
+    number of rows written.
+    """
+    period_start, period_end = get_period_bounds(leaderboard_type, now)
+    
+    scores = get_score_queryset(leaderboard_type, period_start, period_end, partition_by)
+    if partition_by:
+        rank = Window(
+            expression=Rank(),
+            partition_by=[F('partition_key')],
+            order_by=F('score').desc()
+        )
+    else:
+        scores = scores.annotate(partition_key=Value('', output_field=CharField()))
+        rank = Window(expression=Rank(), order_by=F('score').desc())
+    ranked = scores.annotate(entry_rank=rank)
+    select_sql, select_params = ranked.query.sql_with_params()
+    
+    qn = connection.ops.quote_name
+    insert_sql = (
+        f"INSERT INTO {qn(LeaderboardEntry._meta.db_table)} "
+        f"({qn('user_id')}, {qn('leaderboard_type')}, {qn('partition')}, {qn('score')}, "
+        f"{qn('rank')}, {qn('period_start')}, {qn('period_end')}, {qn('calculated_at')}) "
+        f"SELECT ranked.entry_user_id, %s, ranked.partition_key, ranked.score, ranked.entry_rank, "
+        f"%s, %s, %s FROM ({select_sql}) ranked"
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        leaderboard_type,
+        adapt(period_start),
+        adapt(period_end),
+        adapt(timezone.now()),
+        *select_params,
+    ]
+    
+    previous = LeaderboardEntry.objects.filter(leaderboard_type=leaderboard_type)
+    if partition_by:
+        previous = previous.filter(partition__startswith=f'{partition_by}:')
+    else:
+        previous = previous.filter(partition='')
+    
+    with transaction.atomic():
+        previous.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(insert_sql, params)
+            count = cursor.rowcount
+    
+    snapshot_if_due(leaderboard_type, period_start, period_end, partition_by)
+    return count
+
+
+def snapshot_if_due(leaderboard_type, period_start, period_end, partition_by=None):
+    """
+    Keep a packed copy of the current ranks for change tracking.
+    
+    At most one snapshot is kept per LEADERBOARD_SNAPSHOT_INTERVAL_HOURS
+    so frequent materialization does not multiply history storage.
+    """
+    interval = timedelta(hours=getattr(settings, 'LEADERBOARD_SNAPSHOT_INTERVAL_HOURS', 24))
+    snapshots = RankSnapshot.objects.filter(leaderboard_type=leaderboard_type)
+    if partition_by:
+        snapshots = snapshots.filter(partition__startswith=f'{partition_by}:')
+    else:
+        snapshots = snapshots.filter(partition='')
+    latest_end = snapshots.order_by('-period_end').values_list('period_end', flat=True).first()
+    
+    if latest_end is None or period_end - latest_end >= interval:
+        return RankSnapshot.capture(leaderboard_type, period_start, period_end, partition_by)
+    return None
+
+
+def prune_snapshots(retention_days=None):
+    """Delete rank snapshots older than LEADERBOARD_SNAPSHOT_RETENTION_DAYS."""
+    if retention_days is None:
+        retention_days = getattr(settings, 'LEADERBOARD_SNAPSHOT_RETENTION_DAYS', 60)
+    return RankSnapshot.prune(timedelta(days=retention_days))
+
+
+def materialize_all(leaderboard_types=None, now=None, partition_schemes=None):
+    """
+    Materialize several leaderboard types sharing the same period end.
+    
+    Each type is computed once unpartitioned and once per partition scheme
+    in LEADERBOARD_PARTITION_SCHEMES, then written to its memory-mapped
+    snapshot file. Returns a mapping of (leaderboard_type, partition_by) to
+    the number of rows written.
+    """
+    from .snapshot_files import write_snapshot_file
+    
+    now = now or timezone.now()
+    leaderboard_types = leaderboard_types or list(PERIOD_LENGTHS)
+    if partition_schemes is None:
+        partition_schemes = getattr(settings, 'LEADERBOARD_PARTITION_SCHEMES', list(PARTITION_SCHEMES))
+    
+    counts = {}
+    for leaderboard_type in leaderboard_types:
+        for partition_by in [None, *partition_schemes]:
+            counts[(leaderboard_type, partition_by)] = materialize_leaderboard(
+                leaderboard_type, now=now, partition_by=partition_by
+            )
+        write_snapshot_file(leaderboard_type)
+    return counts
+
+
+def current_entries(leaderboard_type, partition=''):
+    """Get the materialized rows for a leaderboard partition in rank order."""
+    return LeaderboardEntry.objects.filter(
+        leaderboard_type=leaderboard_type,
+        partition=partition
+    ).select_related('user__profile').order_by('rank', 'user_id')
+
+
+def get_rank_changes(leaderboard_type, entries):
+    """
+    Get rank changes since the last period for a page of entries.
+    
+    Returns a mapping of user ID to change (positive means the user moved
+    up). The previous ranks come from one snapshot lookup for the page,
+    which must belong to a single partition.
+    """
+    if not entries:
+        return {}
+    
+    before = entries[0].period_end - CHANGE_INTERVALS[leaderboard_type]
+    snapshot = RankSnapshot.previous(leaderboard_type, before, entries[0].partition)
+    if snapshot is None:
+        return {}
+    
+    changes = {}
+    for entry in entries:
+        previous_rank = snapshot.rank_of(entry.user_id)
+        if previous_rank is not None:
+            changes[entry.user_id] = previous_rank - entry.rank
+    return changes
@@ -0,0 +1,94 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField()),
+                ('achievement_type', models.CharField(choices=[('points', 'Points Milestone'), ('activities', 'Activity Count'), ('consistency', 'Consistency'), ('social', 'Social Interaction'), ('challenge', 'Challenge Completion'), ('special', 'Special Event')], max_length=20)),
+                ('required_value', models.FloatField(help_text='Required value to earn this achievement')),
+                ('icon', models.CharField(blank=True, max_length=50)),
+                ('color', models.CharField(default='#ffd700', max_length=7)),
+                ('badge_url', models.URLField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_repeatable', models.BooleanField(default=False, help_text='Whether users can earn this achievement multiple times')),
+                ('points_reward', models.PositiveIntegerField(default=50, help_text='Bonus points awarded for earning this achievement')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['achievement_type', 'required_value'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leaderboard_type', models.CharField(choices=[('overall', 'Overall Points'), ('weekly', 'Weekly Points'), ('monthly', 'Monthly Points'), ('activities', 'Total Activities'), ('duration', 'Total Duration'), ('consistency', 'Consistency Score')], max_length=20)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveIntegerField()),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('calculated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAchievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned_at', models.DateTimeField(auto_now_add=True)),
+                ('progress_value', models.FloatField(help_text='The value that triggered this achievement')),
+            ],
+            options={
+                'ordering': ['-earned_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyChallenge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('challenge_type', models.CharField(choices=[('step_count', 'Step Count'), ('activity_minutes', 'Activity Minutes'), ('points', 'Points Goal'), ('activity_variety', 'Activity Variety'), ('consistency', 'Daily Consistency')], max_length=20)),
+                ('target_value', models.FloatField()),
+                ('week_start', models.DateTimeField()),
+                ('week_end', models.DateTimeField()),
+                ('completion_points', models.PositiveIntegerField(default=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-week_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyChallengeParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_value', models.FloatField(default=0)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='leaderboard.weeklychallenge')),
+            ],
+            options={
+                'ordering': ['-last_updated'],
+            },
+        ),
+    ]
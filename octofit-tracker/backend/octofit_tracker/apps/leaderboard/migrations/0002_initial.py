@@ -0,0 +1,75 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('leaderboard', '0001_initial'),
+        ('activities', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weeklychallengeparticipation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='weeklychallenge',
+            name='bonus_achievement',
+            field=models.ForeignKey(blank=True, help_text='Optional achievement awarded for completion', null=True, on_delete=django.db.models.deletion.SET_NULL, to='leaderboard.achievement'),
+        ),
+        migrations.AddField(
+            model_name='weeklychallenge',
+            name='participants',
+            field=models.ManyToManyField(related_name='weekly_challenges', through='leaderboard.WeeklyChallengeParticipation', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='userachievement',
+            name='achievement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_achievements', to='leaderboard.achievement'),
+        ),
+        migrations.AddField(
+            model_name='userachievement',
+            name='related_activity',
+            field=models.ForeignKey(blank=True, help_text='Activity that triggered this achievement', null=True, on_delete=django.db.models.deletion.SET_NULL, to='activities.activity'),
+        ),
+        migrations.AddField(
+            model_name='userachievement',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='required_activity_type',
+            field=models.ForeignKey(blank=True, help_text='Specific activity type required (optional)', null=True, on_delete=django.db.models.deletion.CASCADE, to='activities.activitytype'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='weeklychallengeparticipation',
+            unique_together={('user', 'challenge')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='userachievement',
+            unique_together={('user', 'achievement', 'earned_at')},
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['leaderboard_type', 'period_start', 'period_end', 'rank'], name='leaderboard_leaderb_4c3792_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together={('user', 'leaderboard_type', 'period_start', 'period_end')},
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboard', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leaderboard_type', models.CharField(choices=[('overall', 'Overall Points'), ('weekly', 'Weekly Points'), ('monthly', 'Monthly Points'), ('activities', 'Total Activities'), ('duration', 'Total Duration'), ('consistency', 'Consistency Score')], max_length=20)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('user_ids', models.BinaryField()),
+                ('ranks', models.BinaryField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-period_end'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ranksnapshot',
+            index=models.Index(fields=['leaderboard_type', 'period_end'], name='leaderboard_leaderb_a6b43f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ranksnapshot',
+            unique_together={('leaderboard_type', 'period_start', 'period_end')},
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('leaderboard', '0003_ranksnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ranksnapshot',
+            name='leaderboard_leaderb_a6b43f_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ranksnapshot',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='partition',
+            field=models.CharField(blank=True, default='', help_text="Ranking partition, e.g. 'grade:9' or 'team:42' (empty for everyone)", max_length=30),
+        ),
+        migrations.AddField(
+            model_name='ranksnapshot',
+            name='partition',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together={('user', 'leaderboard_type', 'partition', 'period_start', 'period_end')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='ranksnapshot',
+            unique_together={('leaderboard_type', 'partition', 'period_start', 'period_end')},
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['leaderboard_type', 'partition', 'rank'], name='leaderboard_leaderb_54e066_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ranksnapshot',
+            index=models.Index(fields=['leaderboard_type', 'partition', 'period_end'], name='leaderboard_leaderb_c5ba34_idx'),
+        ),
+    ]
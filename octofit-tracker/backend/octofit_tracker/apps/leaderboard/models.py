@@ -3,7 +3,13 @@ Leaderboard models for OctoFit Tracker.
 
 This module contains models for various leaderboards and rankings.
 """
-from django.db import models
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from django.conf import settings
 
 
@@ -26,6 +32,12 @@ class LeaderboardEntry(models.Model):
         related_name='leaderboard_entries'
     )
     leaderboard_type = models.CharField(max_length=20, choices=LEADERBOARD_TYPES)
+    partition = models.CharField(
+        max_length=30,
+        blank=True,
+        default='',
+        help_text="Ranking partition, e.g. 'grade:9' or 'team:42' (empty for everyone)"
+    )
     score = models.FloatField()
     rank = models.PositiveIntegerField()
     
@@ -37,16 +49,124 @@ class LeaderboardEntry(models.Model):
     calculated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ['user', 'leaderboard_type', 'period_start', 'period_end']
+        unique_together = ['user', 'leaderboard_type', 'partition', 'period_start', 'period_end']
         ordering = ['rank']
         indexes = [
             models.Index(fields=['leaderboard_type', 'period_start', 'period_end', 'rank']),
+            models.Index(fields=['leaderboard_type', 'partition', 'rank']),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_leaderboard_type_display()} - Rank {self.rank}"
 
 
+class RankSnapshot(models.Model):
+    """
+    Compact historical ranks for one leaderboard partition and period.
+    
+    Ranks are stored as two packed arrays sorted by user ID, so a user's
+    previous rank is found with a binary search over the raw bytes.
+    """
+    USER_ID_TYPECODE = 'q'
+    RANK_TYPECODE = 'I'
+    
+    leaderboard_type = models.CharField(
+        max_length=20,
+        choices=LeaderboardEntry.LEADERBOARD_TYPES
+    )
+    partition = models.CharField(max_length=30, blank=True, default='')
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    
+    # Packed arrays of user IDs (sorted) and their ranks
+    user_ids = models.BinaryField()
+    ranks = models.BinaryField()
+    entry_count = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['leaderboard_type', 'partition', 'period_start', 'period_end']
+        ordering = ['-period_end']
+        indexes = [
+            models.Index(fields=['leaderboard_type', 'partition', 'period_end']),
+        ]
+    
+    def __str__(self):
+        scope = f" {self.partition}" if self.partition else ""
+        return f"{self.get_leaderboard_type_display()}{scope} snapshot ({self.period_end:%Y-%m-%d %H:%M})"
+    
+    @classmethod
+    def capture(cls, leaderboard_type, period_start, period_end, partition_by=None):
+        """
+        Pack the current materialized ranks of a leaderboard type.
+        
+        With partition_by (e.g. 'grade'), one snapshot is stored for each
+        partition of that scheme; otherwise the unpartitioned ranks are
+        packed. Returns the list of snapshots written.
+        """
+        entries = LeaderboardEntry.objects.filter(leaderboard_type=leaderboard_type)
+        if partition_by:
+            entries = entries.filter(partition__startswith=f'{partition_by}:')
+        else:
+            entries = entries.filter(partition='')
+        entries = entries.order_by('partition', 'user_id').values_list(
+            'partition', 'user_id', 'rank'
+        )
+        
+        snapshots = []
+        for partition, rows in groupby(entries.iterator(chunk_size=10000), key=itemgetter(0)):
+            user_ids = array(cls.USER_ID_TYPECODE)
+            ranks = array(cls.RANK_TYPECODE)
+            for _, user_id, rank in rows:
+                user_ids.append(user_id)
+                ranks.append(rank)
+            snapshots.append(cls(
+                leaderboard_type=leaderboard_type,
+                partition=partition,
+                period_start=period_start,
+                period_end=period_end,
+                user_ids=user_ids.tobytes(),
+                ranks=ranks.tobytes(),
+                entry_count=len(user_ids)
+            ))
+        
+        with transaction.atomic():
+            cls.objects.filter(
+                leaderboard_type=leaderboard_type,
+                partition__in=[snapshot.partition for snapshot in snapshots],
+                period_start=period_start,
+                period_end=period_end
+            ).delete()
+            cls.objects.bulk_create(snapshots)
+        return snapshots
+    
+    @classmethod
+    def previous(cls, leaderboard_type, before, partition=''):
+        """Get the latest snapshot of a leaderboard partition ending at or before a time."""
+        return cls.objects.filter(
+            leaderboard_type=leaderboard_type,
+            partition=partition,
+            period_end__lte=before
+        ).order_by('-period_end').first()
+    
+    @classmethod
+    def prune(cls, retention):
+        """Delete snapshots older than the retention period."""
+        from django.utils import timezone
+        
+        deleted, _ = cls.objects.filter(period_end__lt=timezone.now() - retention).delete()
+        return deleted
+    
+    def rank_of(self, user_id):
+        """Get a user's rank in this snapshot, or None if not ranked."""
+        user_ids = memoryview(self.user_ids).cast(self.USER_ID_TYPECODE)
+        position = bisect_left(user_ids, user_id)
+        if position < len(user_ids) and user_ids[position] == user_id:
+            return memoryview(self.ranks).cast(self.RANK_TYPECODE)[position]
+        return None
+
+
 class Achievement(models.Model):
     """
     Achievements/badges that users can earn.
@@ -98,6 +218,13 @@ class Achievement(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        """Refresh this process's achievement catalog when saving."""
+        from .achievements import invalidate_catalog
+        
+        super().save(*args, **kwargs)
+        invalidate_catalog()
 
 
 class UserAchievement(models.Model):
@@ -188,6 +315,99 @@ class WeeklyChallenge(models.Model):
         from django.utils import timezone
         now = timezone.now()
         return self.week_start <= now <= self.week_end
+    
+    def get_progress_aggregate(self):
+        """Get the per-user aggregate measuring progress, or None if not tracked."""
+        if self.challenge_type == 'activity_minutes':
+            return models.Sum('duration_minutes')
+        elif self.challenge_type == 'points':
+            return models.Sum('points_earned')
+        elif self.challenge_type == 'activity_variety':
+            return models.Count('activity_type', distinct=True)
+        elif self.challenge_type == 'consistency':
+            return models.Count(TruncDate('activity_date'), distinct=True)
+        return None
+    
+    def refresh_progress(self, batch_size=1000):
+        """
+        Refresh progress for every participant in a few queries.
+        
+        Progress comes from one query grouped by user and changed values are
+        written with a bulk update. Participations that reached the target
+        are claimed with a conditional update, so a completion that an
+        overlapping refresh or update_progress() already claimed is not paid
+        again, and completion points for the claimed ones are credited
+        through the points ledger with one F() update. Returns (updated,
+        completed).
+        """
+        from django.contrib.auth import get_user_model
+        from django.utils import timezone
+        from octofit_tracker.apps.activities.models import Activity
+        from octofit_tracker.apps.users.models import PointsLedgerEntry
+        from octofit_tracker.apps.users.points import credit_many
+        from .achievements import evaluate_challenge_completions
+        from .ranking import record_points
+        
+        aggregate = self.get_progress_aggregate()
+        if aggregate is None:
+            return 0, 0
+        
+        participations = WeeklyChallengeParticipation.objects.filter(challenge=self)
+        values = dict(
+            Activity.objects.filter(
+                user_id__in=participations.values('user_id'),
+                activity_date__gte=self.week_start,
+                activity_date__lte=self.week_end
+            ).values('user_id').annotate(value=aggregate).values_list('user_id', 'value')
+        )
+        
+        now = timezone.now()
+        changed = []
+        reached = []
+        fields = ('id', 'user_id', 'current_value', 'is_completed')
+        for participation in participations.only(*fields).iterator(chunk_size=batch_size):
+            current_value = values.get(participation.user_id) or 0
+            if not participation.is_completed and current_value >= self.target_value:
+                reached.append(participation.pk)
+            if current_value != participation.current_value:
+                participation.current_value = current_value
+                participation.last_updated = now
+                changed.append(participation)
+        
+        User = get_user_model()
+        with transaction.atomic():
+            WeeklyChallengeParticipation.objects.bulk_update(
+                changed, ['current_value', 'last_updated'], batch_size=batch_size
+            )
+            claimed = dict(
+                WeeklyChallengeParticipation.objects.select_for_update().filter(
+                    pk__in=reached, is_completed=False
+                ).values_list('pk', 'user_id')
+            ) if reached else {}
+            WeeklyChallengeParticipation.objects.filter(
+                pk__in=list(claimed), is_completed=False
+            ).update(is_completed=True, completed_at=now, last_updated=now)
+            completed_user_ids = list(claimed.values())
+            if completed_user_ids and self.completion_points:
+                credit_many([
+                    PointsLedgerEntry(
+                        user_id=user_id,
+                        source_type='challenge',
+                        source_id=self.id,
+                        points=self.completion_points,
+                        description=f"Completed {self.name}"[:200]
+                    )
+                    for user_id in completed_user_ids
+                ], batch_size=batch_size)
+        
+        if completed_user_ids:
+            evaluate_challenge_completions(completed_user_ids)
+            for user_id, total_points in User.objects.filter(
+                id__in=completed_user_ids
+            ).values_list('id', 'total_points'):
+                record_points(user_id, total_points)
+        
+        return len(changed), len(completed_user_ids)
 
 
 class WeeklyChallengeParticipation(models.Model):
@@ -230,6 +450,9 @@ class WeeklyChallengeParticipation(models.Model):
         """Update progress based on user's activities."""
         from django.utils import timezone
         from octofit_tracker.apps.activities.models import Activity
+        from .achievements import evaluate_challenge_completion
+        from octofit_tracker.apps.users.points import credit
+        from .ranking import record_points
         
         challenge = self.challenge
         
@@ -241,28 +464,34 @@ class WeeklyChallengeParticipation(models.Model):
         )
         
         # Calculate progress based on challenge type
-        if challenge.challenge_type == 'activity_minutes':
-            self.current_value = activities.aggregate(
-                total=models.Sum('duration_minutes')
-            )['total'] or 0
-        elif challenge.challenge_type == 'points':
-            self.current_value = activities.aggregate(
-                total=models.Sum('points_earned')
-            )['total'] or 0
-        elif challenge.challenge_type == 'activity_variety':
-            self.current_value = activities.values('activity_type').distinct().count()
-        elif challenge.challenge_type == 'consistency':
-            # Count unique days with activities
-            unique_days = activities.dates('activity_date', 'day').count()
-            self.current_value = unique_days
+        aggregate = challenge.get_progress_aggregate()
+        if aggregate is not None:
+            self.current_value = activities.aggregate(total=aggregate)['total'] or 0
         
-        # Check if completed
-        if not self.is_completed and self.current_value >= challenge.target_value:
-            self.is_completed = True
-            self.completed_at = timezone.now()
-            
-            # Award completion points
-            self.user.total_points += challenge.completion_points
-            self.user.save(update_fields=['total_points'])
+        # Claim the completion with a conditional update, so it is paid once even
+        # when a refresh or a retry of this task completes it at the same time
+        now = timezone.now()
+        with transaction.atomic():
+            self.save(update_fields=['current_value', 'last_updated'])
+            completed_now = (
+                not self.is_completed
+                and self.current_value >= challenge.target_value
+                and WeeklyChallengeParticipation.objects.filter(
+                    pk=self.pk, is_completed=False
+                ).update(is_completed=True, completed_at=now) > 0
+            )
+            if completed_now:
+                self.is_completed = True
+                self.completed_at = now
+                
+                # Award completion points
+                if challenge.completion_points:
+                    self.user.total_points = credit(
+                        self.user_id, challenge.completion_points, 'challenge', challenge.id,
+                        description=f"Completed {challenge.name}"
+                    )
         
-        self.save()
\ No newline at end of file
+        if completed_now:
+            if challenge.completion_points:
+                record_points(self.user_id, self.user.total_points)
+            evaluate_challenge_completion(self.user)
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+In-memory ranking indexes for OctoFit Tracker.
+
+Each worker process keeps one RankingIndex per leaderboard type so that
+"what is my rank?" is answered with a couple of binary searches instead of
+a COUNT or GROUP BY over the database. Indexes are built from the database
+on first use, kept current from point changes made by this process and
+rebuilt after LEADERBOARD_RANKING_INDEX_TTL seconds to pick up changes made
+by other processes.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+
+from django.conf import settings
+
+
+class SortedScores:
+    """
+    Sorted multiset of scores with O(log n) rank queries.
+    
+    Scores are kept in sorted buckets of roughly LOAD items. A Fenwick tree
+    over bucket sizes gives the number of scores before any bucket, so
+    counting scores above a value needs two binary searches and a prefix
+    sum. Inserts and removals only shift items within one bucket.
+    """
+    LOAD = 1000
+    
+    def __init__(self, scores=()):
+        values = sorted(scores)
+        self._buckets = [
+            values[i:i + self.LOAD] for i in range(0, len(values), self.LOAD)
+        ]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(values)
+        self._build_tree()
+    
+    def __len__(self):
+        return self._len
+    
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+    
+    def _build_tree(self):
+        """Rebuild the Fenwick tree after buckets are split or removed."""
+        tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+    
+    def _tree_add(self, index, delta):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+    
+    def _prefix_len(self, index):
+        """Number of scores stored in buckets before the given bucket."""
+        total = 0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+    
+    def add(self, score):
+        """Insert a score."""
+        if not self._buckets:
+            self._buckets.append([score])
+            self._maxes.append(score)
+            self._len = 1
+            self._build_tree()
+            return
+        
+        index = min(bisect_left(self._maxes, score), len(self._buckets) - 1)
+        bucket = self._buckets[index]
+        insort(bucket, score)
+        self._maxes[index] = bucket[-1]
+        self._len += 1
+        
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[index:index + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[index:index + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(index, 1)
+    
+    def remove(self, score):
+        """Remove one occurrence of a score."""
+        index = bisect_left(self._maxes, score)
+        if index == len(self._buckets):
+            raise ValueError(f"{score!r} is not in the index")
+        
+        bucket = self._buckets[index]
+        position = bisect_left(bucket, score)
+        if bucket[position] != score:
+            raise ValueError(f"{score!r} is not in the index")
+        
+        del bucket[position]
+        self._len -= 1
+        
+        if bucket:
+            self._maxes[index] = bucket[-1]
+            self._tree_add(index, -1)
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+            self._build_tree()
+    
+    def count_greater(self, score):
+        """Count stored scores strictly greater than the given score."""
+        index = bisect_right(self._maxes, score)
+        if index == len(self._buckets):
+            return 0
+        
+        not_greater = self._prefix_len(index) + bisect_right(self._buckets[index], score)
+        return self._len - not_greater
+
+
+class RankingIndex:
+    """
+    Scores and ranks for one leaderboard.
+    
+    Ranks follow the database definition: one plus the number of ranked
+    users with a strictly higher score.
+    """
+    
+    def __init__(self, scores):
+        self._scores = dict(scores)
+        self._sorted = SortedScores(self._scores.values())
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+    
+    def __len__(self):
+        return len(self._scores)
+    
+    def __contains__(self, user_id):
+        return user_id in self._scores
+    
+    def sorted_scores(self):
+        """Get a copy of all scores in ascending order."""
+        with self._lock:
+            return list(self._sorted)
+    
+    def score_of(self, user_id):
+        """Get a user's score, or None if the user is not ranked."""
+        return self._scores.get(user_id)
+    
+    def rank(self, score):
+        """Get the rank a given score would have on this leaderboard."""
+        with self._lock:
+            return self._sorted.count_greater(score) + 1
+    
+    def rank_of(self, user_id):
+        """Get a user's rank, or None if the user is not ranked."""
+        score = self._scores.get(user_id)
+        return self.rank(score) if score is not None else None
+    
+    def set_score(self, user_id, score):
+        """Set a user's score, adding the user if needed."""
+        with self._lock:
+            old_score = self._scores.get(user_id)
+            if old_score == score:
+                return
+            if old_score is not None:
+                self._sorted.remove(old_score)
+            self._sorted.add(score)
+            self._scores[user_id] = score
+    
+    def add_points(self, user_id, points):
+        """Add points to a user's score, adding the user if needed."""
+        with self._lock:
+            old_score = self._scores.get(user_id)
+            if old_score is not None:
+                self._sorted.remove(old_score)
+            score = (old_score or 0) + points
+            self._sorted.add(score)
+            self._scores[user_id] = score
+    
+    def discard(self, user_id):
+        """Remove a user from the index if present."""
+        with self._lock:
+            score = self._scores.pop(user_id, None)
+            if score is not None:
+                self._sorted.remove(score)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def build_ranking_index(leaderboard_type):
+    """Build a ranking index for a leaderboard type from the database."""
+    from .materialize import get_period_bounds, get_score_queryset
+    
+    period_start, period_end = get_period_bounds(leaderboard_type)
+    scores = get_score_queryset(leaderboard_type, period_start, period_end)
+    return RankingIndex(
+        (row['entry_user_id'], row['score']) for row in scores.iterator()
+    )
+
+
+def get_ranking_index(leaderboard_type):
+    """
+    Get this process's ranking index for a leaderboard type.
+    
+    The index is built on first use and rebuilt once it is older than
+    LEADERBOARD_RANKING_INDEX_TTL seconds.
+    """
+    ttl = getattr(settings, 'LEADERBOARD_RANKING_INDEX_TTL', 300)
+    index = _indexes.get(leaderboard_type)
+    if index is None or time.monotonic() - index.built_at > ttl:
+        with _indexes_lock:
+            index = _indexes.get(leaderboard_type)
+            if index is None or time.monotonic() - index.built_at > ttl:
+                index = build_ranking_index(leaderboard_type)
+                _indexes[leaderboard_type] = index
+    return index
+
+
+def record_points(user_id, total_points, weekly_points=0):
+    """
+    Apply a point change to the ranking indexes built in this process.
+    
+    total_points is None when only the weekly score changed. Only users
+    already present in the overall index (users with public profiles) are
+    updated; anyone else is picked up by the next rebuild.
+    """
+    overall = _indexes.get('overall')
+    if overall is None or user_id not in overall:
+        return
+    
+    if total_points is not None:
+        overall.set_score(user_id, total_points)
+    
+    weekly = _indexes.get('weekly')
+    if weekly is not None and weekly_points:
+        weekly.add_points(user_id, weekly_points)
+
+
+def reset_ranking_indexes():
+    """Drop all indexes so they are rebuilt on next use."""
+    with _indexes_lock:
+        _indexes.clear()
@@ -68,18 +68,23 @@ class WeeklyChallengeSerializer(serializers.ModelSerializer):
     
     def get_participant_count(self, obj):
         """Get number of participants."""
+        if hasattr(obj, 'participant_count'):
+            return obj.participant_count
         return obj.participants.count()
     
     def get_completion_rate(self, obj):
         """Get challenge completion rate."""
-        total_participants = obj.participants.count()
+        total_participants = self.get_participant_count(obj)
         if total_participants == 0:
             return 0
         
-        completed = WeeklyChallengeParticipation.objects.filter(
-            challenge=obj,
-            is_completed=True
-        ).count()
+        if hasattr(obj, 'completed_count'):
+            completed = obj.completed_count
+        else:
+            completed = WeeklyChallengeParticipation.objects.filter(
+                challenge=obj,
+                is_completed=True
+            ).count()
         
         return round((completed / total_participants) * 100, 1)
     
@@ -87,10 +92,14 @@ class WeeklyChallengeSerializer(serializers.ModelSerializer):
         """Get current user's participation in this challenge."""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            participation = WeeklyChallengeParticipation.objects.filter(
-                challenge=obj,
-                user=request.user
-            ).first()
+            if hasattr(obj, 'user_participations'):
+                # Prefetched by WeeklyChallengeViewSet for the requesting user
+                participation = next(iter(obj.user_participations), None)
+            else:
+                participation = WeeklyChallengeParticipation.objects.filter(
+                    challenge=obj,
+                    user=request.user
+                ).first()
             
             if participation:
                 return WeeklyChallengeParticipationSerializer(participation).data
@@ -0,0 +1,203 @@
+"""
+Memory-mapped leaderboard snapshot files for OctoFit Tracker.
+
+After materialization, each leaderboard type is written to one binary file
+in LEADERBOARD_SNAPSHOT_DIR. Worker processes memory-map the file read-only,
+so every process on a host shares a single copy in the page cache and a
+page of rankings is decoded straight from the mapped bytes.
+
+File layout (little-endian):
+    header       magic, format version, generation, period start/end,
+                 partition count
+    partitions   one (key, first record, record count) entry per partition,
+                 sorted by key
+    records      fixed-width (user_id, score, rank) records, grouped by
+                 partition in rank order
+
+Writers build the file under a temporary name and rename it into place, so
+readers see either the old or the new file. Readers compare the file's
+inode and modification time on every access and remap when it changes.
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import LeaderboardEntry
+
+
+MAGIC = b'OFLB'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHxxqddI')
+PARTITION = struct.Struct('<32sQQ')
+RECORD = struct.Struct('<qdI')
+
+
+def get_snapshot_path(leaderboard_type):
+    """Get the snapshot file path for a leaderboard type."""
+    return Path(settings.LEADERBOARD_SNAPSHOT_DIR) / f'{leaderboard_type}.lbs'
+
+
+def write_snapshot_file(leaderboard_type):
+    """
+    Write the materialized rows of a leaderboard type to its snapshot file.
+    
+    Rows are streamed from one query, so the records and the partition
+    table built from them always agree without holding a transaction (and,
+    on SQLite, the write lock) during file I/O. Records go to a scratch
+    file first, since the partition table precedes them; the assembled
+    file then replaces the current one atomically. Returns the number of
+    records.
+    """
+    path = get_snapshot_path(leaderboard_type)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    
+    entries = LeaderboardEntry.objects.filter(leaderboard_type=leaderboard_type)
+    bounds = entries.values_list('period_start', 'period_end').first()
+    rows = entries.order_by('partition', 'rank', 'user_id').values_list(
+        'partition', 'user_id', 'score', 'rank'
+    )
+    
+    partitions = []
+    written = 0
+    with tempfile.TemporaryFile(dir=path.parent) as records:
+        for partition, user_id, score, rank in rows.iterator(chunk_size=10000):
+            if not partitions or partitions[-1][0] != partition:
+                partitions.append([partition, written, 0])
+            partitions[-1][2] += 1
+            records.write(RECORD.pack(user_id, score, rank))
+            written += 1
+        
+        period_start, period_end = bounds or (None, None)
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                time.time_ns(),
+                period_start.timestamp() if period_start else 0.0,
+                period_end.timestamp() if period_end else 0.0,
+                len(partitions)
+            ))
+            for partition, first, count in partitions:
+                f.write(PARTITION.pack(partition.encode(), first, count))
+            
+            records.seek(0)
+            shutil.copyfileobj(records, f)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    os.replace(temp_path, path)
+    return written
+
+
+class SnapshotFile:
+    """A read-only memory map of one leaderboard snapshot file."""
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        
+        magic, version, generation, period_start, period_end, count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} leaderboard snapshot")
+        
+        self.generation = generation
+        self.period_start = datetime.fromtimestamp(period_start, dt_timezone.utc)
+        self.period_end = datetime.fromtimestamp(period_end, dt_timezone.utc)
+        
+        self._partitions = {}
+        for key, first, length in PARTITION.iter_unpack(
+            self._mmap[HEADER.size:HEADER.size + count * PARTITION.size]
+        ):
+            self._partitions[key.rstrip(b'\0').decode()] = (first, length)
+        self._records_start = HEADER.size + count * PARTITION.size
+    
+    def count(self, partition=''):
+        """Get the number of ranked users in a partition."""
+        return self._partitions.get(partition, (0, 0))[1]
+    
+    def page(self, partition='', offset=0, limit=50):
+        """Get (user_id, score, rank) records of a partition in rank order."""
+        first, length = self._partitions.get(partition, (0, 0))
+        offset = min(max(offset, 0), length)
+        stop = min(offset + limit, length)
+        
+        begin = self._records_start + (first + offset) * RECORD.size
+        end = self._records_start + (first + stop) * RECORD.size
+        with memoryview(self._mmap) as view:
+            return list(RECORD.iter_unpack(view[begin:end]))
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def get_snapshot_file(leaderboard_type):
+    """
+    Get the mapped snapshot file for a leaderboard type.
+    
+    Returns None when no readable file exists, so callers can fall back to
+    the database.
+    """
+    path = get_snapshot_path(leaderboard_type)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    
+    snapshot = _files.get(leaderboard_type)
+    if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+        with _files_lock:
+            snapshot = _files.get(leaderboard_type)
+            if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+                try:
+                    snapshot = SnapshotFile(path)
+                except (OSError, ValueError, struct.error):
+                    return None
+                _files[leaderboard_type] = snapshot
+    return snapshot
+
+
+def read_entries(leaderboard_type, partition='', offset=0, limit=50):
+    """
+    Get a page of leaderboard entries from the snapshot file.
+    
+    Returns unsaved LeaderboardEntry objects with users (and profiles)
+    loaded in one query, or None if there is no snapshot file.
+    """
+    from django.contrib.auth import get_user_model
+    
+    snapshot = get_snapshot_file(leaderboard_type)
+    if snapshot is None:
+        return None
+    
+    records = snapshot.page(partition, offset, limit)
+    users = get_user_model().objects.select_related('profile').in_bulk(
+        [user_id for user_id, _, _ in records]
+    )
+    
+    entries = []
+    for user_id, score, rank in records:
+        if user_id not in users:
+            continue
+        entries.append(LeaderboardEntry(
+            user=users[user_id],
+            leaderboard_type=leaderboard_type,
+            partition=partition,
+            score=score,
+            rank=rank,
+            period_start=snapshot.period_start,
+            period_end=snapshot.period_end
+        ))
+    return entries
@@ -0,0 +1,27 @@
+"""
+Background tasks for leaderboards, achievements and challenges.
+"""
+from octofit_tracker.apps.tasks.queue import task
+
+from .models import WeeklyChallengeParticipation
+
+
+@task('leaderboard.evaluate_activity')
+def evaluate_activity(activity_id):
+    """Award achievements earned by a logged activity."""
+    from octofit_tracker.apps.activities.models import Activity
+    from .achievements import evaluate_activity as evaluate
+    
+    activity = Activity.objects.select_related('user').filter(pk=activity_id).first()
+    if activity is not None:
+        evaluate(activity)
+
+
+@task('leaderboard.update_participation_progress')
+def update_participation_progress(participation_id):
+    """Recompute one user's progress in a weekly challenge."""
+    participation = WeeklyChallengeParticipation.objects.select_related(
+        'challenge', 'user'
+    ).filter(pk=participation_id).first()
+    if participation is not None:
+        participation.update_progress()
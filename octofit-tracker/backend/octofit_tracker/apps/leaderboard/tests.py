@@ -0,0 +1,350 @@
+"""
+Tests for leaderboards and achievements.
+
+The ranking endpoints must issue a fixed number of queries whatever the
+page size, so each is checked with a 1-row and a 50-row page. Achievements
+must be awarded once per occurrence however often evaluation is repeated.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from octofit_tracker.apps.activities.models import Activity, ActivityType
+from octofit_tracker.apps.teams.models import Team, TeamMembership
+from octofit_tracker.apps.users.models import PointsLedgerEntry, User, UserProfile
+
+from .achievements import evaluate_activity, invalidate_catalog
+from .models import (
+    Achievement, LeaderboardEntry, UserAchievement, WeeklyChallenge, WeeklyChallengeParticipation
+)
+from .snapshot_files import write_snapshot_file
+
+
+def create_users(count, prefix='user'):
+    """Create users with public profiles."""
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', total_points=count - i)
+        for i in range(count)
+    ])
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    return users
+
+
+def create_entries(leaderboard_type, users):
+    """Create materialized leaderboard rows ranking users in order."""
+    now = timezone.now()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            user=user,
+            leaderboard_type=leaderboard_type,
+            score=len(users) - rank,
+            rank=rank,
+            period_start=now - timedelta(days=7),
+            period_end=now
+        )
+        for rank, user in enumerate(users, 1)
+    ])
+
+
+class LeaderboardQueryCountTests(TestCase):
+    """Query counts of the ranking endpoints for small and full pages."""
+    
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir)
+        settings_override = override_settings(
+            LEADERBOARD_SNAPSHOT_DIR=self.snapshot_dir,
+            PERFORMANCE_SAMPLE_RATE=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.viewer = create_users(1, prefix='viewer')[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+    
+    def assertPageQueries(self, url, rows, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), rows)
+    
+    def test_overall_and_weekly_from_database(self):
+        # Materialized rows: the page with users and profiles, then the rank snapshot
+        for rows in (1, 50):
+            with self.subTest(rows=rows):
+                LeaderboardEntry.objects.all().delete()
+                users = create_users(rows, prefix=f'db{rows}-')
+                for leaderboard_type in ('overall', 'weekly'):
+                    create_entries(leaderboard_type, users)
+                    self.assertPageQueries(f'/api/leaderboard/{leaderboard_type}/', rows, 2)
+    
+    def test_overall_and_weekly_from_snapshot_files(self):
+        # Snapshot files: the page's users with profiles, then the rank snapshot
+        for rows in (1, 50):
+            with self.subTest(rows=rows):
+                LeaderboardEntry.objects.all().delete()
+                users = create_users(rows, prefix=f'file{rows}-')
+                for leaderboard_type in ('overall', 'weekly'):
+                    create_entries(leaderboard_type, users)
+                    write_snapshot_file(leaderboard_type)
+                    self.assertPageQueries(f'/api/leaderboard/{leaderboard_type}/', rows, 2)
+    
+    def test_teams(self):
+        for rows in (1, 20):
+            with self.subTest(rows=rows):
+                Team.objects.all().delete()
+                captains = create_users(rows, prefix=f'captain{rows}-')
+                teams = Team.objects.bulk_create([
+                    Team(name=f'Team {rows}-{i}', description='', captain=captain, total_points=i)
+                    for i, captain in enumerate(captains)
+                ])
+                TeamMembership.objects.bulk_create([
+                    TeamMembership(team=team, user=team.captain, role='captain')
+                    for team in teams
+                ])
+                self.assertPageQueries('/api/leaderboard/teams/', rows, 1)
+    
+    def test_challenge_leaderboard(self):
+        # The challenge with its annotations and the viewer's participation,
+        # then the participations with users
+        now = timezone.now()
+        for rows in (1, 50):
+            with self.subTest(rows=rows):
+                challenge = WeeklyChallenge.objects.create(
+                    name=f'Challenge {rows}',
+                    description='',
+                    challenge_type='points',
+                    target_value=100,
+                    week_start=now - timedelta(days=1),
+                    week_end=now + timedelta(days=6)
+                )
+                WeeklyChallengeParticipation.objects.bulk_create([
+                    WeeklyChallengeParticipation(user=user, challenge=challenge, current_value=i)
+                    for i, user in enumerate(create_users(rows, prefix=f'challenger{rows}-'))
+                ])
+                self.assertPageQueries(
+                    f'/api/leaderboard/challenges/{challenge.pk}/leaderboard/', rows, 3
+                )
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0)
+class AroundMeTests(TestCase):
+    """The around_me window on boards where many users share a rank."""
+    
+    def setUp(self):
+        self.users = create_users(200)
+        now = timezone.now()
+        # Everyone tied on 0 points, as on the overall board before any activity
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(
+                user=user,
+                leaderboard_type='overall',
+                score=0,
+                rank=1,
+                period_start=now - timedelta(days=7),
+                period_end=now
+            )
+            for user in self.users
+        ])
+        self.client = APIClient()
+    
+    def get_window(self, user, k):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/leaderboard/around_me/?k={k}')
+        self.assertEqual(response.status_code, 200)
+        return [row['user_id'] for row in response.data]
+    
+    def test_tied_ranks_return_k_rows_each_side(self):
+        user = self.users[100]
+        ids = [u.id for u in self.users]
+        position = ids.index(user.id)
+        self.assertEqual(self.get_window(user, 3), ids[position - 3:position + 4])
+    
+    def test_window_is_clipped_at_the_top(self):
+        ids = [u.id for u in self.users]
+        self.assertEqual(self.get_window(self.users[1], 5), ids[:7])
+    
+    def test_k_is_capped(self):
+        self.assertEqual(len(self.get_window(self.users[100], 1000)), 51)
+
+
+class AchievementAwardTests(TestCase):
+    """Online and backfilled achievements are awarded once per occurrence."""
+    
+    def setUp(self):
+        invalidate_catalog()
+        self.addCleanup(invalidate_catalog)
+        self.activity_type = ActivityType.objects.create(name='Running', category='cardio')
+        self.three = Achievement.objects.create(
+            name='Three activities', description='', achievement_type='activities',
+            required_value=3, points_reward=10
+        )
+        self.every_two = Achievement.objects.create(
+            name='Every two activities', description='', achievement_type='activities',
+            required_value=2, is_repeatable=True, points_reward=5
+        )
+        self.users = create_users(3)
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir)
+    
+    def log(self, user, count):
+        now = timezone.now()
+        return [
+            Activity.objects.create(
+                user=user,
+                activity_type=self.activity_type,
+                name='Run',
+                duration_minutes=10,
+                activity_date=now - timedelta(days=count - i)
+            )
+            for i in range(count)
+        ]
+    
+    def awards(self, user, achievement):
+        return sorted(
+            UserAchievement.objects.filter(user=user, achievement=achievement)
+            .values_list('progress_value', flat=True)
+        )
+    
+    def backfill(self, **options):
+        out = StringIO()
+        call_command('backfill_achievements', stdout=out, **options)
+        return out.getvalue()
+    
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_threshold_is_awarded_once(self):
+        user = self.users[0]
+        activities = self.log(user, 5)
+        self.assertEqual(self.awards(user, self.three), [3])
+        
+        # Evaluating the same activities again, as a retried task would
+        for activity in activities:
+            evaluate_activity(activity)
+        self.assertEqual(self.awards(user, self.three), [3])
+        self.assertEqual(self.awards(user, self.every_two), [2, 4])
+    
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_repeatable_is_awarded_at_each_multiple(self):
+        user = self.users[0]
+        self.log(user, 7)
+        self.assertEqual(self.awards(user, self.every_two), [2, 4, 6])
+        
+        user.refresh_from_db()
+        self.assertEqual(user.total_points, 3 + 7 * 10 + 10 + 3 * 5)
+    
+    def test_backfill_twice_creates_no_duplicates(self):
+        # Without eager tasks the activities are only queued for evaluation
+        for user in self.users:
+            self.log(user, 5)
+        self.assertFalse(UserAchievement.objects.exists())
+        
+        self.backfill()
+        totals = dict(User.objects.filter(pk__in=[u.pk for u in self.users]).values_list('pk', 'total_points'))
+        for user in self.users:
+            self.assertEqual(self.awards(user, self.three), [3])
+            self.assertEqual(self.awards(user, self.every_two), [2, 4])
+        
+        self.backfill()
+        self.assertEqual(UserAchievement.objects.count(), 9)
+        self.assertEqual(
+            dict(User.objects.filter(pk__in=totals).values_list('pk', 'total_points')), totals
+        )
+    
+    def test_backfill_skips_online_awards(self):
+        user = self.users[0]
+        with override_settings(TASK_QUEUE_EAGER=True):
+            self.log(user, 3)
+        self.log(user, 2)
+        self.backfill()
+        self.assertEqual(self.awards(user, self.three), [3])
+        self.assertEqual(self.awards(user, self.every_two), [2, 4])
+    
+    def test_backfill_resumes_from_checkpoint(self):
+        for user in self.users:
+            self.log(user, 4)
+        checkpoint = os.path.join(self.snapshot_dir, 'checkpoint.json')
+        self.backfill(checkpoint=checkpoint, range_size=1)
+        
+        # A run that died after committing the last range but before recording it
+        with open(checkpoint) as f:
+            completed = json.load(f)['completed']
+        with open(checkpoint, 'w') as f:
+            json.dump({'completed': completed[:-1]}, f)
+        
+        self.assertIn(f'1 of {len(completed)} user ID ranges', self.backfill(checkpoint=checkpoint, range_size=1))
+        for user in self.users:
+            self.assertEqual(self.awards(user, self.three), [3])
+            self.assertEqual(self.awards(user, self.every_two), [2, 4])
+
+
+class ChallengeCompletionTests(TestCase):
+    """Completion points are paid once whichever path completes a challenge."""
+    
+    def setUp(self):
+        now = timezone.now()
+        self.user = create_users(1)[0]
+        activity_type = ActivityType.objects.create(name='Running', category='cardio')
+        self.challenge = WeeklyChallenge.objects.create(
+            name='Fifty points',
+            description='',
+            challenge_type='points',
+            target_value=50,
+            completion_points=100,
+            week_start=now - timedelta(days=3),
+            week_end=now + timedelta(days=3)
+        )
+        self.participation = WeeklyChallengeParticipation.objects.create(
+            user=self.user, challenge=self.challenge
+        )
+        Activity.objects.create(
+            user=self.user,
+            activity_type=activity_type,
+            name='Run',
+            duration_minutes=60,
+            activity_date=now - timedelta(days=1)
+        )
+        self.user.refresh_from_db()
+        self.points_before = self.user.total_points
+    
+    def assertPaidOnce(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_points, self.points_before + 100)
+        self.assertEqual(
+            PointsLedgerEntry.objects.filter(
+                user=self.user, source_type='challenge', source_id=self.challenge.pk
+            ).count(),
+            1
+        )
+        self.assertTrue(WeeklyChallengeParticipation.objects.get(pk=self.participation.pk).is_completed)
+    
+    def load_participation(self):
+        return WeeklyChallengeParticipation.objects.select_related('challenge', 'user').get(
+            pk=self.participation.pk
+        )
+    
+    def test_update_progress_then_refresh(self):
+        self.load_participation().update_progress()
+        self.assertEqual(self.challenge.refresh_progress(), (0, 0))
+        self.assertPaidOnce()
+    
+    def test_refresh_then_stale_update_progress(self):
+        # The task loaded the participation before the refresh completed it
+        participation = self.load_participation()
+        self.assertEqual(self.challenge.refresh_progress(), (1, 1))
+        participation.update_progress()
+        self.assertPaidOnce()
+    
+    def test_update_progress_retried(self):
+        first, retry = self.load_participation(), self.load_participation()
+        first.update_progress()
+        retry.update_progress()
+        self.assertPaidOnce()
@@ -3,10 +3,12 @@ Views for leaderboard-related endpoints.
 """
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Q
+from django.db.models import Count, Q, Prefetch
 from django.utils import timezone
-from datetime import timedelta, datetime
+
+from octofit_tracker.db.replica import ReplicaReadMixin
 
 from .models import LeaderboardEntry, Achievement, UserAchievement, WeeklyChallenge, WeeklyChallengeParticipation
 from .serializers import (
@@ -14,9 +16,18 @@ from .serializers import (
     WeeklyChallengeSerializer, WeeklyChallengeParticipationSerializer,
     LeaderboardSummarySerializer, UserRankingSerializer
 )
+from .materialize import current_entries, get_rank_changes, partition_key
+from .distribution import DISTRIBUTION_TYPES, get_score_distribution
+from .ranking import get_ranking_index
+from .snapshot_files import read_entries
+from .tasks import update_participation_progress
+
 
+# Largest number of rows around_me returns on each side of the user
+AROUND_ME_MAX_K = 25
 
-class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
+
+class LeaderboardViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for leaderboard data."""
     serializer_class = LeaderboardEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -27,15 +38,16 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Filter by leaderboard type
         leaderboard_type = self.request.query_params.get('type', 'overall')
-        queryset = queryset.filter(leaderboard_type=leaderboard_type)
+        queryset = queryset.filter(
+            leaderboard_type=leaderboard_type,
+            partition=self._get_partition(self.request)
+        )
         
         # Filter by time period
         period = self.request.query_params.get('period', 'current')
         if period == 'current':
             # Get the most recent period for this leaderboard type
-            latest_entry = LeaderboardEntry.objects.filter(
-                leaderboard_type=leaderboard_type
-            ).order_by('-period_end').first()
+            latest_entry = queryset.order_by('-period_end').first()
             
             if latest_entry:
                 queryset = queryset.filter(
@@ -45,67 +57,123 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset.order_by('rank')
     
-    @action(detail=False, methods=['get'])
-    def overall(self, request):
-        """Get overall points leaderboard."""
+    def _get_partition(self, request):
+        """
+        Get the partition selected by ?grade= or ?team=.
+        
+        Returns the stored partition key, or '' to rank everyone.
+        """
         from django.contrib.auth import get_user_model
-        User = get_user_model()
         
-        # Get top users by total points
-        users = User.objects.filter(
-            profile__is_profile_public=True
-        ).order_by('-total_points')[:50]
+        grade = request.query_params.get('grade')
+        team = request.query_params.get('team')
+        if grade and team:
+            raise ParseError('Filter by grade or team, not both.')
+        
+        if grade:
+            grades = dict(get_user_model()._meta.get_field('grade_level').choices)
+            if grade not in grades:
+                raise ParseError('Invalid grade level.')
+            return partition_key('grade', grade)
+        
+        if team:
+            try:
+                return partition_key('team', int(team))
+            except ValueError:
+                raise ParseError('Invalid team ID.')
+        
+        return ''
+    
+    def _get_page(self, leaderboard_type, request, page_size=50):
+        """
+        Get the ?page= of a leaderboard partition.
+        
+        Pages are sliced from the memory-mapped snapshot file, falling back
+        to the materialized rows when the file is not available.
+        """
+        partition = self._get_partition(request)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * page_size
+        
+        entries = read_entries(leaderboard_type, partition, offset, page_size)
+        if entries is None:
+            entries = current_entries(leaderboard_type, partition)[offset:offset + page_size]
+        return entries
+    
+    def _ranking_data(self, leaderboard_type, entries):
+        """Build ranking rows from materialized leaderboard entries."""
+        entries = list(entries)
+        changes = get_rank_changes(leaderboard_type, entries)
         
         leaderboard_data = []
-        for idx, user in enumerate(users, 1):
+        for entry in entries:
+            user = entry.user
             leaderboard_data.append({
                 'user_id': user.id,
                 'username': user.username,
                 'full_name': user.get_full_name() if user.profile.show_real_name else user.username,
-                'rank': idx,
-                'score': float(user.total_points),
-                'change_from_last_period': None  # Could be calculated from historical data
+                'rank': entry.rank,
+                'score': entry.score,
+                'change_from_last_period': changes.get(user.id)
             })
+        return leaderboard_data
+    
+    @action(detail=False, methods=['get'])
+    def overall(self, request):
+        """Get overall points leaderboard, optionally within a ?grade= or ?team=."""
+        entries = self._get_page('overall', request)
         
-        serializer = UserRankingSerializer(leaderboard_data, many=True)
+        serializer = UserRankingSerializer(self._ranking_data('overall', entries), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def weekly(self, request):
-        """Get weekly points leaderboard."""
-        from django.contrib.auth import get_user_model
-        from octofit_tracker.apps.activities.models import Activity
-        
-        User = get_user_model()
+        """Get weekly points leaderboard, optionally within a ?grade= or ?team=."""
+        entries = self._get_page('weekly', request)
         
-        # Calculate weekly points (last 7 days)
-        week_start = timezone.now() - timedelta(days=7)
+        serializer = UserRankingSerializer(self._ranking_data('weekly', entries), many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def around_me(self, request):
+        """Get the entries ranked just above and below the current user."""
+        leaderboard_type = request.query_params.get('type', 'overall')
+        if leaderboard_type not in dict(LeaderboardEntry.LEADERBOARD_TYPES):
+            return Response(
+                {'detail': 'Invalid leaderboard type.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get users with their weekly points
-        weekly_points = Activity.objects.filter(
-            activity_date__gte=week_start,
-            user__profile__is_profile_public=True
-        ).values(
-            'user__id', 'user__username', 'user__first_name', 'user__last_name'
-        ).annotate(
-            weekly_points=Sum('points_earned')
-        ).order_by('-weekly_points')[:50]
+        try:
+            k = min(int(request.query_params.get('k', 5)), AROUND_ME_MAX_K)
+        except ValueError:
+            k = 5
+        k = max(k, 0)
         
-        leaderboard_data = []
-        for idx, data in enumerate(weekly_points, 1):
-            user = User.objects.get(id=data['user__id'])
-            full_name = f"{data['user__first_name']} {data['user__last_name']}".strip()
-            
-            leaderboard_data.append({
-                'user_id': data['user__id'],
-                'username': data['user__username'],
-                'full_name': full_name if user.profile.show_real_name else data['user__username'],
-                'rank': idx,
-                'score': float(data['weekly_points']),
-                'change_from_last_period': None
-            })
+        partition = self._get_partition(request)
+        ranked = current_entries(leaderboard_type, partition)
+        entry = ranked.filter(user=request.user).first()
+        if not entry:
+            return Response(
+                {'detail': 'You are not ranked on this leaderboard.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        serializer = UserRankingSerializer(leaderboard_data, many=True)
+        # Ranks tie (thousands of users can share one), so take k rows on each
+        # side of the user's row in (rank, user_id) order rather than a rank range
+        ranked = ranked.filter(period_start=entry.period_start, period_end=entry.period_end)
+        above = ranked.filter(
+            Q(rank__lt=entry.rank) | Q(rank=entry.rank, user_id__lt=entry.user_id)
+        ).order_by('-rank', '-user_id')[:k]
+        below = ranked.filter(
+            Q(rank__gt=entry.rank) | Q(rank=entry.rank, user_id__gt=entry.user_id)
+        ).order_by('rank', 'user_id')[:k]
+        entries = [*reversed(above), entry, *below]
+        
+        serializer = UserRankingSerializer(self._ranking_data(leaderboard_type, entries), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -115,6 +183,8 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         
         teams = Team.objects.filter(
             is_public=True
+        ).select_related('captain').annotate(
+            active_member_count=Count('memberships', filter=Q(memberships__is_active=True))
         ).order_by('-total_points')[:20]
         
         team_data = []
@@ -124,43 +194,72 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
                 'team_name': team.name,
                 'rank': idx,
                 'score': float(team.total_points),
-                'member_count': team.member_count,
+                'member_count': team.active_member_count,
                 'captain': team.captain.username
             })
         
         return Response(team_data)
     
+    def _get_user_score(self, leaderboard_type, user, index):
+        """Get a user's overall or weekly score, including unranked users."""
+        if leaderboard_type == 'overall':
+            from django.contrib.auth import get_user_model
+            
+            # request.user may come from the user caches, so read the balance
+            return get_user_model().objects.filter(pk=user.pk).values_list(
+                'total_points', flat=True
+            ).first()
+        
+        score = index.score_of(user.id)
+        if score is None:
+            # Private profiles are not indexed, so read their own window
+            from octofit_tracker.apps.activities.models import WeeklyPointsWindow
+            score, _ = WeeklyPointsWindow.totals_for(user.id)
+        return score
+    
+    @action(detail=False, methods=['get'])
+    def distribution(self, request):
+        """Get the score histogram, percentiles and the current user's percentile."""
+        leaderboard_type = request.query_params.get('type', 'overall')
+        if leaderboard_type not in DISTRIBUTION_TYPES:
+            return Response(
+                {'detail': 'Distributions are available for overall and weekly scores.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            bins = min(int(request.query_params.get('bins', 10)), 50)
+        except ValueError:
+            bins = 10
+        bins = max(bins, 1)
+        
+        distribution = get_score_distribution(leaderboard_type)
+        user_score = self._get_user_score(
+            leaderboard_type, request.user, get_ranking_index(leaderboard_type)
+        )
+        
+        return Response({
+            'type': leaderboard_type,
+            **distribution.summary(),
+            'histogram': distribution.histogram(bins),
+            'user_score': float(user_score),
+            'user_percentile': distribution.percentile_of(user_score),
+        })
+    
     @action(detail=False, methods=['get'])
     def my_ranking(self, request):
         """Get current user's ranking across different leaderboards."""
         user = request.user
         
         # Overall ranking
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        overall_rank = User.objects.filter(
-            total_points__gt=user.total_points,
-            profile__is_profile_public=True
-        ).count() + 1
+        overall_index = get_ranking_index('overall')
+        overall_points = self._get_user_score('overall', user, overall_index)
+        overall_rank = overall_index.rank(overall_points)
         
         # Weekly ranking
-        from octofit_tracker.apps.activities.models import Activity
-        week_start = timezone.now() - timedelta(days=7)
-        
-        user_weekly_points = Activity.objects.filter(
-            user=user,
-            activity_date__gte=week_start
-        ).aggregate(total=Sum('points_earned'))['total'] or 0
-        
-        weekly_rank = Activity.objects.filter(
-            activity_date__gte=week_start,
-            user__profile__is_profile_public=True
-        ).values('user').annotate(
-            weekly_points=Sum('points_earned')
-        ).filter(
-            weekly_points__gt=user_weekly_points
-        ).count() + 1
+        weekly_index = get_ranking_index('weekly')
+        user_weekly_points = self._get_user_score('weekly', user, weekly_index)
+        weekly_rank = weekly_index.rank(user_weekly_points)
         
         # Recent achievements
         recent_achievements = UserAchievement.objects.filter(
@@ -169,7 +268,7 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         
         summary_data = {
             'overall_rank': overall_rank,
-            'overall_score': float(user.total_points),
+            'overall_score': float(overall_points),
             'weekly_rank': weekly_rank,
             'weekly_score': float(user_weekly_points),
             'total_achievements': user.achievements.count(),
@@ -210,20 +309,38 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class WeeklyChallengeViewSet(viewsets.ReadOnlyModelViewSet):
+class WeeklyChallengeViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for weekly challenges."""
     serializer_class = WeeklyChallengeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = {'leaderboard'}
     
     def get_queryset(self):
-        """Get weekly challenges ordered by most recent."""
-        return WeeklyChallenge.objects.filter(is_active=True).order_by('-week_start')
+        """
+        Get weekly challenges ordered by most recent.
+        
+        Participant and completion counts are annotated and the requesting
+        user's participation is prefetched, so serializing a page of
+        challenges takes a fixed number of queries.
+        """
+        return WeeklyChallenge.objects.filter(is_active=True).annotate(
+            participant_count=Count('weeklychallengeparticipation'),
+            completed_count=Count(
+                'weeklychallengeparticipation',
+                filter=Q(weeklychallengeparticipation__is_completed=True)
+            )
+        ).prefetch_related(
+            Prefetch(
+                'weeklychallengeparticipation_set',
+                queryset=WeeklyChallengeParticipation.objects.filter(user=self.request.user),
+                to_attr='user_participations'
+            )
+        ).order_by('-week_start')
     
     @action(detail=False, methods=['get'])
     def current(self, request):
         """Get current week's challenge."""
-        current_challenge = WeeklyChallenge.objects.filter(
-            is_active=True,
+        current_challenge = self.get_queryset().filter(
             week_start__lte=timezone.now(),
             week_end__gte=timezone.now()
         ).first()
@@ -259,8 +376,8 @@ class WeeklyChallengeViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update progress immediately
-        participation.update_progress()
+        # Compute progress in the background
+        update_participation_progress.enqueue(participation.pk)
         
         serializer = WeeklyChallengeParticipationSerializer(participation)
         return Response({
@@ -285,7 +402,7 @@ class WeeklyChallengeViewSet(viewsets.ReadOnlyModelViewSet):
         
         participations = WeeklyChallengeParticipation.objects.filter(
             challenge=challenge
-        ).order_by('-current_value')[:50]
+        ).select_related('user', 'challenge').order_by('-current_value')[:50]
         
         leaderboard_data = []
         for idx, participation in enumerate(participations, 1):
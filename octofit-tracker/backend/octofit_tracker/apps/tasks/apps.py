@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'octofit_tracker.apps.tasks'
+    
+    def ready(self):
+        # Register the @task functions in every app's tasks module
+        autodiscover_modules('tasks')
@@ -0,0 +1,48 @@
+"""
+Run queued background tasks.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.tasks.queue import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks until interrupted, or until the queue is empty with --once."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help="Number of tasks run per batch (default: 100)"
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty (default: 1)"
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once no tasks are due instead of polling"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            succeeded, failed = run_worker(
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                once=options['once']
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+            return
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran tasks in {elapsed:.2f}s ({succeeded} succeeded, {failed} failed)."
+        ))
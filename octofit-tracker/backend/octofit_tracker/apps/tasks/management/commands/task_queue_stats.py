@@ -0,0 +1,42 @@
+"""
+Report background task queue depth and latency.
+"""
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.tasks.queue import queue_stats
+
+
+class Command(BaseCommand):
+    help = "Show pending, running and failed task counts and recent wait and run times."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=60,
+            help="Minutes of finished tasks to report latency for (default: 60)"
+        )
+    
+    def handle(self, *args, **options):
+        stats = queue_stats(window_minutes=options['window'])
+        
+        self.stdout.write(
+            f"pending={stats['pending']} running={stats['running']} failed={stats['failed']}"
+        )
+        for name, count in stats['pending_by_name'].items():
+            self.stdout.write(f"  {name}: {count} pending")
+        if stats['oldest_pending_seconds'] is not None:
+            self.stdout.write(f"Oldest pending task: {stats['oldest_pending_seconds']:.1f}s")
+        
+        for label in ('wait', 'run'):
+            summary = stats[f'{label}_seconds']
+            if summary['avg'] is None:
+                continue
+            self.stdout.write(
+                f"{label:>4}: avg {summary['avg']:.3f}s  p95 {summary['p95']:.3f}s  "
+                f"max {summary['max']:.3f}s"
+            )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['completed']} tasks completed in the last {stats['window_minutes']} minutes."
+        ))
@@ -0,0 +1,250 @@
+"""
+Background task queue for OctoFit Tracker.
+
+Recomputations that used to run inside request handlers are registered
+with @task and enqueued instead; the run_tasks command executes them.
+
+    @task('teams.update_team_stats')
+    def update_team_stats(team_id):
+        ...
+    
+    update_team_stats.enqueue(team.id)
+
+Jobs live in the Task table, so they commit or roll back with the request
+that queued them. Each job has a key (by default its name and arguments)
+and at most one pending job exists per key: a burst of writes to one team
+queues a single "recompute team 42". Failed jobs are retried with backoff
+up to TASK_MAX_ATTEMPTS times. With TASK_QUEUE_EAGER the functions run
+immediately instead, which is convenient without a worker.
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as a task and give it an enqueue() method."""
+    def register(func):
+        if name in _registry:
+            raise ValueError(f"Task {name} is already registered.")
+        _registry[name] = func
+        func.task_name = name
+        func.enqueue = lambda *args, **options: enqueue(name, *args, **options)
+        func.enqueue_many = lambda args_list, **options: enqueue_many(name, args_list, **options)
+        return func
+    return register
+
+
+def get_task_key(name, args):
+    return ':'.join([name, *map(str, args)])
+
+
+def enqueue(name, *args, key=None, delay=0):
+    """Queue a call of a registered task unless the same key is already pending."""
+    enqueue_many(name, [args], keys=[key] if key else None, delay=delay)
+
+
+def enqueue_many(name, args_list, keys=None, delay=0):
+    """Queue several calls of one task with a single INSERT."""
+    if name not in _registry:
+        raise KeyError(f"Unknown task {name}.")
+    if not args_list:
+        return
+    
+    if getattr(settings, 'TASK_QUEUE_EAGER', False):
+        for args in args_list:
+            _registry[name](*args)
+        return
+    
+    now = timezone.now()
+    keys = keys or [get_task_key(name, args) for args in args_list]
+    # Keys that are already pending hit the partial unique index and are skipped
+    Task.objects.bulk_create([
+        Task(
+            name=name,
+            key=key,
+            args=list(args),
+            created_at=now,
+            run_after=now + timedelta(seconds=delay)
+        )
+        for key, args in zip(keys, args_list)
+    ], ignore_conflicts=True)
+
+
+def _claim_next():
+    """Mark the next due pending task as running and return it, or None."""
+    while True:
+        now = timezone.now()
+        task_id = Task.objects.filter(
+            status='pending', run_after__lte=now
+        ).order_by('id').values_list('id', flat=True).first()
+        if task_id is None:
+            return None
+        # Conditional update, so concurrent workers never run a task twice
+        if Task.objects.filter(pk=task_id, status='pending').update(
+            status='running', started_at=now, attempts=models.F('attempts') + 1
+        ):
+            return Task.objects.get(pk=task_id)
+
+
+def _requeue(queued, **fields):
+    """Put a task back to pending, or drop it if its key was queued again meanwhile."""
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=queued.pk).update(status='pending', **fields)
+    except IntegrityError:
+        # The pending task with the same key will do the work
+        Task.objects.filter(pk=queued.pk).delete()
+
+
+def run_pending(limit=100):
+    """
+    Run up to `limit` due tasks in queue order.
+    
+    Each task is claimed just before it runs, so started_at is when it
+    actually started and requeue_stale() never takes back a task that is
+    only waiting its turn in this batch.
+    
+    Returns (succeeded, failed) counts for this batch.
+    """
+    max_attempts = getattr(settings, 'TASK_MAX_ATTEMPTS', 5)
+    succeeded = failed = 0
+    
+    for _ in range(limit):
+        queued = _claim_next()
+        if queued is None:
+            break
+        func = _registry.get(queued.name)
+        try:
+            if func is None:
+                raise KeyError(f"Unknown task {queued.name}.")
+            func(*queued.args)
+        except Exception:
+            failed += 1
+            error = traceback.format_exc()
+            logger.exception("Task %s failed (attempt %d)", queued.key, queued.attempts)
+            if func is not None and queued.attempts < max_attempts:
+                _requeue(
+                    queued,
+                    last_error=error,
+                    run_after=timezone.now() + timedelta(seconds=2 ** queued.attempts)
+                )
+            else:
+                Task.objects.filter(pk=queued.pk).update(
+                    status='failed', last_error=error, finished_at=timezone.now()
+                )
+        else:
+            succeeded += 1
+            Task.objects.filter(pk=queued.pk).update(status='done', finished_at=timezone.now())
+    
+    return succeeded, failed
+
+
+def requeue_stale(timeout=None):
+    """Return tasks left running by a worker that died to the queue."""
+    if timeout is None:
+        timeout = getattr(settings, 'TASK_RUNNING_TIMEOUT', 600)
+    stale = Task.objects.filter(
+        status='running', started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    for queued in stale:
+        _requeue(queued)
+    return len(stale)
+
+
+def purge_finished(hours=None):
+    """Delete done tasks older than TASK_RETENTION_HOURS. Failed tasks are kept."""
+    if hours is None:
+        hours = getattr(settings, 'TASK_RETENTION_HOURS', 24)
+    deleted, _ = Task.objects.filter(
+        status='done', finished_at__lt=timezone.now() - timedelta(hours=hours)
+    ).delete()
+    return deleted
+
+
+def _summarize(seconds):
+    if not seconds:
+        return {'avg': None, 'p95': None, 'max': None}
+    seconds = sorted(seconds)
+    return {
+        'avg': round(sum(seconds) / len(seconds), 3),
+        'p95': round(seconds[min(int(len(seconds) * 0.95), len(seconds) - 1)], 3),
+        'max': round(seconds[-1], 3),
+    }
+
+
+def queue_stats(window_minutes=60):
+    """
+    Report queue depth and latency.
+    
+    Depth counts tasks by status and pending tasks by name. Latency covers
+    tasks finished in the last `window_minutes`: wait is the time from
+    first enqueue to start, run the time from start to finish.
+    """
+    now = timezone.now()
+    by_status = dict(
+        Task.objects.values('status').annotate(count=models.Count('id')).order_by()
+        .values_list('status', 'count')
+    )
+    pending = Task.objects.filter(status='pending')
+    by_name = dict(
+        pending.values('name').annotate(count=models.Count('id')).order_by('name')
+        .values_list('name', 'count')
+    )
+    oldest = pending.aggregate(oldest=models.Min('created_at'))['oldest']
+    
+    finished = Task.objects.filter(
+        status='done', finished_at__gte=now - timedelta(minutes=window_minutes)
+    ).values_list('created_at', 'started_at', 'finished_at')
+    waits, runs = [], []
+    for created_at, started_at, finished_at in finished:
+        waits.append((started_at - created_at).total_seconds())
+        runs.append((finished_at - started_at).total_seconds())
+    
+    return {
+        'pending': by_status.get('pending', 0),
+        'running': by_status.get('running', 0),
+        'failed': by_status.get('failed', 0),
+        'pending_by_name': by_name,
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 3) if oldest else None,
+        'completed': len(waits),
+        'window_minutes': window_minutes,
+        'wait_seconds': _summarize(waits),
+        'run_seconds': _summarize(runs),
+    }
+
+
+def run_worker(batch_size=100, sleep=1.0, once=False):
+    """
+    Run tasks until interrupted, or until the queue is empty with once=True.
+    
+    Returns the total (succeeded, failed) counts.
+    """
+    succeeded = failed = 0
+    last_maintenance = 0
+    while True:
+        if time.monotonic() - last_maintenance > 60:
+            requeue_stale()
+            purge_finished()
+            last_maintenance = time.monotonic()
+        
+        batch_succeeded, batch_failed = run_pending(batch_size)
+        succeeded += batch_succeeded
+        failed += batch_failed
+        
+        if not batch_succeeded and not batch_failed:
+            if once:
+                return succeeded, failed
+            time.sleep(sleep)
@@ -0,0 +1,113 @@
+"""
+Tests for the task queue.
+
+Each key has at most one pending task, each task runs once per claim, and
+failing or abandoned tasks go back to the queue until they give up.
+"""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import _claim_next, enqueue, requeue_stale, run_pending, task
+
+
+calls = []
+
+
+@task('tests.record')
+def record(*args):
+    calls.append(args)
+
+
+@task('tests.fail')
+def fail():
+    raise RuntimeError("always fails")
+
+
+@override_settings(TASK_QUEUE_EAGER=False, TASK_MAX_ATTEMPTS=5, TASK_RUNNING_TIMEOUT=600)
+class TaskQueueTests(TestCase):
+    """Enqueueing, claiming, retrying and requeueing tasks."""
+    
+    def setUp(self):
+        calls.clear()
+    
+    def test_same_key_pending_once(self):
+        record.enqueue(42)
+        record.enqueue(42)
+        record.enqueue_many([(42,), (43,)])
+        enqueue('tests.record', 44, key='tests.record:42')
+        self.assertEqual(
+            sorted(Task.objects.filter(status='pending').values_list('key', flat=True)),
+            ['tests.record:42', 'tests.record:43']
+        )
+        
+        self.assertEqual(run_pending(), (2, 0))
+        self.assertEqual(sorted(calls), [(42,), (43,)])
+        
+        # Once the task ran, the key can be queued again
+        record.enqueue(42)
+        self.assertEqual(Task.objects.filter(status='pending').count(), 1)
+    
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_runs_immediately(self):
+        record.enqueue(42)
+        self.assertEqual(calls, [(42,)])
+        self.assertFalse(Task.objects.exists())
+    
+    def test_claimed_task_not_claimed_again(self):
+        record.enqueue(42)
+        claimed = _claim_next()
+        self.assertEqual((claimed.status, claimed.attempts), ('running', 1))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(_claim_next())
+        self.assertEqual(run_pending(), (0, 0))
+        self.assertEqual(calls, [])
+    
+    def test_delayed_task_waits(self):
+        record.enqueue(42, delay=60)
+        self.assertIsNone(_claim_next())
+    
+    def test_failing_task_backs_off_then_fails(self):
+        fail.enqueue()
+        for attempt in range(1, 6):
+            before = timezone.now()
+            with self.assertLogs('octofit_tracker.apps.tasks.queue', 'ERROR'):
+                self.assertEqual(run_pending(), (0, 1))
+            queued = Task.objects.get()
+            self.assertEqual(queued.attempts, attempt)
+            self.assertIn("always fails", queued.last_error)
+            if attempt < 5:
+                self.assertEqual(queued.status, 'pending')
+                self.assertGreaterEqual(queued.run_after, before + timedelta(seconds=2 ** attempt))
+                self.assertLess(queued.run_after, timezone.now() + timedelta(seconds=2 ** attempt))
+                # Not due until the backoff has passed
+                self.assertEqual(run_pending(), (0, 0))
+                Task.objects.update(run_after=timezone.now())
+        
+        self.assertEqual(queued.status, 'failed')
+        self.assertIsNotNone(queued.finished_at)
+        self.assertEqual(run_pending(), (0, 0))
+    
+    def test_requeue_stale_running_tasks(self):
+        record.enqueue(42)
+        record.enqueue(43)
+        stuck, recent = _claim_next(), _claim_next()
+        Task.objects.filter(pk=stuck.pk).update(started_at=timezone.now() - timedelta(seconds=601))
+        
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Task.objects.get(pk=stuck.pk).status, 'pending')
+        self.assertEqual(Task.objects.get(pk=recent.pk).status, 'running')
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(calls, [(42,)])
+    
+    def test_requeue_stale_drops_task_queued_again(self):
+        record.enqueue(42)
+        stuck = _claim_next()
+        Task.objects.filter(pk=stuck.pk).update(started_at=timezone.now() - timedelta(seconds=601))
+        record.enqueue(42)
+        
+        self.assertEqual(requeue_stale(), 1)
+        self.assertFalse(Task.objects.filter(pk=stuck.pk).exists())
+        self.assertEqual(Task.objects.filter(status='pending').count(), 1)
@@ -0,0 +1,33 @@
+"""
+Credit bonuses for finished team challenges.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from octofit_tracker.apps.teams.models import TeamChallenge
+
+
+class Command(BaseCommand):
+    help = "Credit winner and participant bonuses for finished team challenges that have not been awarded."
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        
+        challenges = TeamChallenge.objects.filter(
+            is_active=True,
+            end_date__lt=timezone.now(),
+            bonuses_awarded_at__isnull=True
+        )
+        
+        awarded = 0
+        for challenge in challenges:
+            credited = challenge.award_bonuses()
+            awarded += 1
+            self.stdout.write(f"{challenge}: {credited} users credited")
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Awarded bonuses for {awarded} team challenges in {elapsed:.2f}s."
+        ))
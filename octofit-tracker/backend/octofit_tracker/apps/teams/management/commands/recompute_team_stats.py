@@ -0,0 +1,29 @@
+"""
+Recompute stored statistics for all teams.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.teams.models import Team
+
+
+class Command(BaseCommand):
+    help = "Recompute total points and activities for every team in one grouped pass."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of teams written per bulk update (default: 500)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = Team.recompute_all_stats(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed team stats in {elapsed:.2f}s ({changed} teams changed)."
+        ))
@@ -0,0 +1,86 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('is_public', models.BooleanField(default=True, help_text='Whether other users can see and join this team')),
+                ('requires_approval', models.BooleanField(default=False, help_text='Whether new members need approval to join')),
+                ('max_members', models.PositiveIntegerField(default=50, validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(1000)])),
+                ('total_points', models.PositiveIntegerField(default=0)),
+                ('total_activities', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('color', models.CharField(default='#007bff', max_length=7)),
+                ('logo_url', models.URLField(blank=True)),
+            ],
+            options={
+                'ordering': ['-total_points', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamChallenge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('challenge_type', models.CharField(choices=[('points', 'Most Points'), ('activities', 'Most Activities'), ('duration', 'Total Duration'), ('consistency', 'Daily Consistency'), ('specific_activity', 'Specific Activity')], max_length=20)),
+                ('target_value', models.FloatField(blank=True, null=True)),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_public', models.BooleanField(default=True)),
+                ('max_teams', models.PositiveIntegerField(default=10)),
+                ('winner_points_bonus', models.PositiveIntegerField(default=100)),
+                ('participant_points_bonus', models.PositiveIntegerField(default=25)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamInvitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField(blank=True)),
+                ('is_accepted', models.BooleanField(default=False)),
+                ('is_declined', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('member', 'Member'), ('moderator', 'Moderator'), ('captain', 'Captain')], default='member', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_approved', models.BooleanField(default=True)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('left_at', models.DateTimeField(blank=True, null=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='teams.team')),
+            ],
+            options={
+                'ordering': ['-joined_at'],
+            },
+        ),
+    ]
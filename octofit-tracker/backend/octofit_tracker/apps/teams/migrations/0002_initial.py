@@ -0,0 +1,67 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('teams', '0001_initial'),
+        ('activities', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teammembership',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_memberships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teaminvitation',
+            name='invited_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_team_invitations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teaminvitation',
+            name='invited_user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_invitations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teaminvitation',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to='teams.team'),
+        ),
+        migrations.AddField(
+            model_name='teamchallenge',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_challenges', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teamchallenge',
+            name='specific_activity_type',
+            field=models.ForeignKey(blank=True, help_text='Required for specific_activity challenges', null=True, on_delete=django.db.models.deletion.CASCADE, to='activities.activitytype'),
+        ),
+        migrations.AddField(
+            model_name='teamchallenge',
+            name='teams',
+            field=models.ManyToManyField(related_name='challenges', to='teams.team'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='captain',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='led_teams', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='teammembership',
+            unique_together={('user', 'team')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='teaminvitation',
+            unique_together={('team', 'invited_user')},
+        ),
+    ]
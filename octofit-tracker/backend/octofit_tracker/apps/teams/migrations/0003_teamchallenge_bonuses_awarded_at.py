@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamchallenge',
+            name='bonuses_awarded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
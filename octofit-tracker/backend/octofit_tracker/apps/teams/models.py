@@ -82,6 +82,40 @@ class Team(models.Model):
         self.total_points = totals['total_points'] or 0
         self.total_activities = totals['total_activities'] or 0
         self.save(update_fields=['total_points', 'total_activities'])
+    
+    @classmethod
+    def recompute_all_stats(cls, batch_size=500):
+        """
+        Recompute statistics for every team in one grouped pass.
+        
+        Totals come from a single query over active memberships joined to
+        activities, and only teams whose stored values differ are written
+        back. Returns the number of changed teams.
+        """
+        totals = {
+            row['team_id']: row
+            for row in TeamMembership.objects.filter(is_active=True).values('team_id').annotate(
+                total_points=models.Sum('user__activities__points_earned'),
+                total_activities=models.Count('user__activities')
+            )
+        }
+        
+        changed = []
+        teams = cls.objects.only('id', 'total_points', 'total_activities')
+        for team in teams.iterator(chunk_size=batch_size):
+            row = totals.get(team.id, {})
+            total_points = row.get('total_points') or 0
+            total_activities = row.get('total_activities') or 0
+            
+            if (team.total_points, team.total_activities) != (total_points, total_activities):
+                team.total_points = total_points
+                team.total_activities = total_activities
+                changed.append(team)
+        
+        cls.objects.bulk_update(
+            changed, ['total_points', 'total_activities'], batch_size=batch_size
+        )
+        return len(changed)
 
 
 class TeamMembership(models.Model):
@@ -161,6 +195,7 @@ class TeamChallenge(models.Model):
     # Rewards
     winner_points_bonus = models.PositiveIntegerField(default=100)
     participant_points_bonus = models.PositiveIntegerField(default=25)
+    bonuses_awarded_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(
@@ -228,6 +263,69 @@ class TeamChallenge(models.Model):
         # Sort by score (descending)
         results.sort(key=lambda x: x['score'], reverse=True)
         return results
+    
+    def award_bonuses(self):
+        """
+        Credit winner and participant bonuses once the challenge has finished.
+        
+        Active members of the top-scoring team(s) get winner_points_bonus and
+        members of the other teams get participant_points_bonus, through the
+        points ledger. A user on several participating teams is credited
+        once, with the larger bonus. Returns the number of users credited,
+        or 0 if the challenge is not finished or was already awarded.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from octofit_tracker.apps.leaderboard.ranking import record_points
+        from octofit_tracker.apps.users.models import PointsLedgerEntry
+        from octofit_tracker.apps.users.points import credit_many
+        
+        if not self.is_finished or self.bonuses_awarded_at:
+            return 0
+        
+        results = self.get_team_results()
+        best_score = max((result['score'] for result in results), default=None)
+        winners = {
+            result['team'].id for result in results
+            if best_score and result['score'] == best_score
+        }
+        
+        bonuses = {}
+        memberships = TeamMembership.objects.filter(
+            team__in=[result['team'] for result in results],
+            is_active=True
+        ).values_list('user_id', 'team_id')
+        for user_id, team_id in memberships:
+            if team_id in winners:
+                award = (self.winner_points_bonus, f"Won {self.name}")
+            else:
+                award = (self.participant_points_bonus, f"Took part in {self.name}")
+            bonuses[user_id] = max(award, bonuses.get(user_id, award))
+        
+        with transaction.atomic():
+            # Claim the challenge first so concurrent runs cannot award twice
+            awarded_at = timezone.now()
+            claimed = TeamChallenge.objects.filter(
+                pk=self.pk, bonuses_awarded_at__isnull=True
+            ).update(bonuses_awarded_at=awarded_at)
+            if not claimed:
+                return 0
+            self.bonuses_awarded_at = awarded_at
+            
+            balances = credit_many([
+                PointsLedgerEntry(
+                    user_id=user_id,
+                    source_type='team_challenge',
+                    source_id=self.id,
+                    points=bonus,
+                    description=description[:200]
+                )
+                for user_id, (bonus, description) in bonuses.items() if bonus
+            ])
+        
+        for user_id, total_points in balances.items():
+            record_points(user_id, total_points)
+        return len(balances)
 
 
 class TeamInvitation(models.Model):
@@ -0,0 +1,22 @@
+"""
+Background tasks for teams.
+"""
+from octofit_tracker.apps.tasks.queue import task
+
+from .models import Team, TeamMembership
+
+
+@task('teams.update_team_stats')
+def update_team_stats(team_id):
+    """Recompute a team's totals from its members' activities."""
+    team = Team.objects.filter(pk=team_id).first()
+    if team is not None:
+        team.update_team_stats()
+
+
+def enqueue_member_teams(user_id):
+    """Queue a stats refresh for every team the user is an active member of."""
+    team_ids = TeamMembership.objects.filter(
+        user_id=user_id, is_active=True
+    ).values_list('team_id', flat=True)
+    update_team_stats.enqueue_many([(team_id,) for team_id in team_ids])
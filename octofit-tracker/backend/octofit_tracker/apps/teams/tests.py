@@ -0,0 +1,71 @@
+"""
+Tests for teams.
+
+Team challenge bonuses are credited through the points ledger and must be
+paid once per challenge however often awarding runs.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from octofit_tracker.apps.activities.models import Activity, ActivityType
+from octofit_tracker.apps.users.models import PointsLedgerEntry, User
+from octofit_tracker.apps.users.points import find_drift
+
+from .models import Team, TeamChallenge, TeamMembership
+
+
+class TeamChallengeBonusTests(TestCase):
+    """award_bonuses() credits winners and participants once."""
+    
+    def setUp(self):
+        now = timezone.now()
+        activity_type = ActivityType.objects.create(name='Running', category='cardio')
+        self.challenge = TeamChallenge.objects.create(
+            name='Spring cup',
+            description='',
+            challenge_type='points',
+            start_date=now - timedelta(days=7),
+            end_date=now - timedelta(days=1),
+            winner_points_bonus=100,
+            participant_points_bonus=25,
+            created_by=User.objects.create(username='organizer', email='organizer@example.com')
+        )
+        self.members = {}
+        for name, minutes in (('red', 60), ('blue', 30)):
+            users = [
+                User.objects.create(username=f'{name}{i}', email=f'{name}{i}@example.com')
+                for i in range(2)
+            ]
+            team = Team.objects.create(name=name, description='', captain=users[0])
+            TeamMembership.objects.bulk_create([TeamMembership(team=team, user=user) for user in users])
+            self.challenge.teams.add(team)
+            Activity.objects.create(
+                user=users[0],
+                activity_type=activity_type,
+                name='Run',
+                duration_minutes=minutes,
+                activity_date=now - timedelta(days=3)
+            )
+            self.members[name] = users
+        self.balances = dict(User.objects.values_list('pk', 'total_points'))
+    
+    def assertBonuses(self):
+        balances = dict(User.objects.values_list('pk', 'total_points'))
+        for name, bonus in (('red', 100), ('blue', 25)):
+            for user in self.members[name]:
+                self.assertEqual(balances[user.pk], self.balances[user.pk] + bonus)
+        self.assertEqual(PointsLedgerEntry.objects.filter(source_type='team_challenge').count(), 4)
+        self.assertEqual(find_drift(), [])
+    
+    def test_award_bonuses_twice_pays_once(self):
+        self.assertEqual(self.challenge.award_bonuses(), 4)
+        self.assertEqual(self.challenge.award_bonuses(), 0)
+        self.assertBonuses()
+    
+    def test_stale_copy_cannot_award_again(self):
+        stale = TeamChallenge.objects.get(pk=self.challenge.pk)
+        self.assertEqual(self.challenge.award_bonuses(), 4)
+        self.assertEqual(stale.award_bonuses(), 0)
+        self.assertBonuses()
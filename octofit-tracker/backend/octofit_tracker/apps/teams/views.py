@@ -7,9 +7,11 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.db.models import Sum, Count, Avg
 from django.utils import timezone
-from datetime import timedelta
+
+from octofit_tracker.db.replica import ReplicaReadMixin
 
 from .models import Team, TeamMembership, TeamChallenge, TeamInvitation
+from .tasks import update_team_stats
 from .serializers import (
     TeamSerializer, TeamCreateSerializer, TeamMembershipSerializer,
     TeamChallengeSerializer, TeamInvitationSerializer, JoinTeamSerializer,
@@ -17,9 +19,10 @@ from .serializers import (
 )
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """ViewSet for team management."""
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = {'stats'}
     
     def get_queryset(self):
         """Filter teams based on visibility."""
@@ -88,8 +91,8 @@ class TeamViewSet(viewsets.ModelViewSet):
             message = "Join request sent. Waiting for approval."
         else:
             message = "Successfully joined team!"
-            # Update team stats
-            team.update_team_stats()
+            # Update team stats in the background
+            update_team_stats.enqueue(team.id)
         
         return Response({
             'message': message,
@@ -120,8 +123,8 @@ class TeamViewSet(viewsets.ModelViewSet):
         membership.left_at = timezone.now()
         membership.save()
         
-        # Update team stats
-        team.update_team_stats()
+        # Update team stats in the background
+        update_team_stats.enqueue(team.id)
         
         return Response({'message': 'Successfully left team.'})
     
@@ -177,7 +180,7 @@ class TeamViewSet(viewsets.ModelViewSet):
         avg_points = team.total_points / member_count if member_count > 0 else 0
         
         # Most active member
-        from octofit_tracker.apps.activities.models import Activity
+        from octofit_tracker.apps.activities.models import Activity, WeeklyPointsWindow
         member_users = team.memberships.filter(is_active=True).values_list('user', flat=True)
         
         most_active = Activity.objects.filter(
@@ -187,13 +190,12 @@ class TeamViewSet(viewsets.ModelViewSet):
         ).order_by('-activity_count').first()
         
         # This week stats
-        week_start = timezone.now() - timedelta(days=7)
-        this_week = Activity.objects.filter(
-            user__in=member_users,
-            activity_date__gte=week_start
+        WeeklyPointsWindow.rotate_if_due()
+        this_week = WeeklyPointsWindow.objects.filter(
+            user__in=member_users
         ).aggregate(
-            week_points=Sum('points_earned'),
-            week_activities=Count('id')
+            week_points=Sum('points'),
+            week_activities=Sum('activities')
         )
         
         stats_data = {
@@ -330,8 +332,8 @@ class TeamInvitationViewSet(viewsets.ReadOnlyModelViewSet):
             is_approved=True
         )
         
-        # Update team stats
-        invitation.team.update_team_stats()
+        # Update team stats in the background
+        update_team_stats.enqueue(invitation.team_id)
         
         return Response({'message': 'Invitation accepted! Welcome to the team!'})
     
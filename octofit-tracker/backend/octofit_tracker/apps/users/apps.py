@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'octofit_tracker.apps.users'
\ No newline at end of file
+    name = 'octofit_tracker.apps.users'
+    
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from .authentication import invalidate_deleted_token, invalidate_deleted_user
+        from .models import User
+        
+        # Revoked tokens and deleted users must stop authenticating wherever they are deleted
+        post_delete.connect(
+            invalidate_deleted_token, sender=Token, dispatch_uid='users.invalidate_deleted_token'
+        )
+        post_delete.connect(
+            invalidate_deleted_user, sender=User, dispatch_uid='users.invalidate_deleted_user'
+        )
@@ -0,0 +1,231 @@
+"""
+Cached token authentication for OctoFit Tracker.
+
+DRF's TokenAuthentication reads the token and its user on every request,
+and most views then load user.profile as well. CachedTokenAuthentication,
+and CachedAuthenticationMiddleware for session logins, keep authenticated
+users with their profiles in two tiers:
+
+    local    a bounded LRU in each process; a hit costs no queries and no
+             cache round trips
+    shared   the default Django cache, holding token -> user ID and
+             user ID -> user, so one database lookup serves every process
+
+Saving a user or profile and deleting a user, profile or token (on
+logout, in the admin, in bulk or anywhere else) drop the shared entries and
+this process's LRU entries. Other processes drop their local copies within
+AUTH_TOKEN_LOCAL_TTL seconds, so that setting bounds how long a deactivated
+user or revoked token stays usable.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .models import User
+
+
+def _token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def _user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class LocalTokenCache:
+    """
+    A thread-safe LRU of token key (or user key) -> user with a per-entry TTL.
+    
+    An index of user ID -> keys lets discard_user drop a user's entries
+    without scanning the whole cache.
+    """
+    
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._user_keys = defaultdict(set)
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """Get a copy of the cached user for a token, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        # Each request gets its own instance so attribute changes don't leak
+        return copy.copy(user)
+    
+    def set(self, key, user):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._user_keys[user.pk].add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+    
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+    
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+    
+    def _remove(self, key):
+        # Callers hold the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].pk
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+    """Get this process's token LRU, creating it from settings on first use."""
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                _local_cache = LocalTokenCache(
+                    getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+                    getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', 30)
+                )
+    return _local_cache
+
+
+def _drop_user(user_id):
+    cache.delete(_user_cache_key(user_id))
+    get_local_cache().discard_user(user_id)
+
+
+def invalidate_user(user_id):
+    """
+    Drop a user's cached copies after the user or profile changed.
+    
+    Inside a transaction the copies are dropped again once it commits, so
+    a request between the write and the commit cannot cache the old user.
+    """
+    _drop_user(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_drop_user, user_id))
+
+
+def invalidate_token(key):
+    """Drop a revoked token from the caches."""
+    cache.delete(_token_cache_key(key))
+    get_local_cache().discard(key)
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    post_delete receiver for Token: drop tokens however they were deleted.
+    
+    Also runs once the deletion commits, so a request that cached the token
+    between the delete and the commit cannot keep it alive.
+    """
+    invalidate_token(instance.key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+def invalidate_deleted_user(sender, instance, **kwargs):
+    """post_delete receiver for User: drop cached copies however the user was deleted."""
+    invalidate_user(instance.pk)
+
+
+def get_cached_user(user_id):
+    """
+    Get an active user, with profile, by ID from the caches or the database.
+    
+    Returns None if there is no active user with that ID.
+    """
+    local_cache = get_local_cache()
+    local_key = f'user:{user_id}'
+    user = local_cache.get(local_key)
+    if user is not None:
+        return user
+    
+    user = cache.get(_user_cache_key(user_id))
+    if user is None:
+        user = User.objects.select_related('profile').filter(pk=user_id, is_active=True).first()
+        if user is None:
+            return None
+        cache.set(_user_cache_key(user_id), user, getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300))
+    
+    local_cache.set(local_key, user)
+    return copy.copy(user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication backed by the local and shared user caches.
+    
+    request.auth is an unsaved Token carrying the key and user.
+    """
+    
+    def authenticate_credentials(self, key):
+        local_cache = get_local_cache()
+        user = local_cache.get(key)
+        if user is None:
+            user = self._get_shared(key)
+            if user is None:
+                user = self._get_from_database(key)
+            local_cache.set(key, user)
+            user = copy.copy(user)
+        
+        return user, self.get_model()(key=key, user=user)
+    
+    def _get_shared(self, key):
+        user_id = cache.get(_token_cache_key(key))
+        if user_id is None:
+            return None
+        return cache.get(_user_cache_key(user_id))
+    
+    def _get_from_database(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user__profile').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        
+        ttl = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300)
+        cache.set_many({
+            _token_cache_key(key): token.user_id,
+            _user_cache_key(token.user_id): token.user,
+        }, ttl)
+        return token.user
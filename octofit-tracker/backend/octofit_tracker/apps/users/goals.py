@@ -0,0 +1,111 @@
+"""
+Automatic fitness goal progress for OctoFit Tracker.
+
+Goals of the activity-derived types measure minutes of matching activity
+logged since the goal was created. Each activity write moves all of the
+user's matching goals with one UPDATE that also marks goals whose target
+is reached as achieved, the same way mark_achieved does. Weight loss and
+muscle gain goals depend on body measurements and stay manual.
+
+Progress is tracked while a goal is active and not yet achieved.
+"""
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import FitnessGoal
+from .stats import invalidate_user_stats
+
+
+# Goal type -> activity categories that count towards it (None: all)
+GOAL_ACTIVITY_CATEGORIES = {
+    'endurance': ('cardio', 'outdoor', 'sports'),
+    'strength': ('strength',),
+    'flexibility': ('flexibility',),
+    'general_fitness': None,
+}
+
+
+def get_goal_types(category):
+    """Get the goal types that activities of a category count towards."""
+    return [
+        goal_type for goal_type, categories in GOAL_ACTIVITY_CATEGORIES.items()
+        if categories is None or category in categories
+    ]
+
+
+def apply_activity(user_id, category, activity_date, minutes):
+    """
+    Add minutes of activity to a user's matching goals.
+    
+    Negative minutes remove an edited or deleted activity's progress.
+    Returns the number of goals updated.
+    """
+    goal_types = get_goal_types(category)
+    if not goal_types or not minutes:
+        return 0
+    
+    progress = F('current_value') + minutes
+    updates = {
+        'current_value': Greatest(progress, Value(0.0)),
+        'updated_at': timezone.now(),
+    }
+    if minutes > 0:
+        # SET expressions all see the row's old values, so test the new total
+        reached = Q(target_value__gt=0, target_value__lte=progress)
+        updates['is_achieved'] = Case(When(reached, then=Value(True)), default=Value(False))
+        updates['is_active'] = Case(When(reached, then=Value(False)), default=Value(True))
+    
+    updated = FitnessGoal.objects.filter(
+        user_id=user_id,
+        goal_type__in=goal_types,
+        is_active=True,
+        is_achieved=False,
+        created_at__lte=activity_date
+    ).update(**updates)
+    
+    if updated:
+        invalidate_user_stats([user_id])
+    return updated
+
+
+def recompute_goal_progress(user_ids=None):
+    """
+    Recompute tracked goals from the activity history.
+    
+    Runs one UPDATE per goal type with a correlated SUM of activity minutes,
+    then marks goals that reached their target as achieved. Returns
+    (goals updated, goals achieved).
+    """
+    from octofit_tracker.apps.activities.models import Activity
+    
+    goals = FitnessGoal.objects.filter(
+        goal_type__in=list(GOAL_ACTIVITY_CATEGORIES), is_active=True, is_achieved=False
+    )
+    if user_ids is not None:
+        goals = goals.filter(user_id__in=user_ids)
+    affected_users = list(goals.order_by().values_list('user_id', flat=True).distinct())
+    
+    now = timezone.now()
+    updated = 0
+    for goal_type, categories in GOAL_ACTIVITY_CATEGORIES.items():
+        activities = Activity.objects.filter(
+            user=OuterRef('user'), activity_date__gte=OuterRef('created_at')
+        )
+        if categories is not None:
+            activities = activities.filter(activity_type__category__in=categories)
+        minutes = activities.order_by().values('user').annotate(
+            total=Sum('duration_minutes')
+        ).values('total')
+        
+        updated += goals.filter(goal_type=goal_type).update(
+            current_value=Coalesce(Subquery(minutes, output_field=FloatField()), Value(0.0)),
+            updated_at=now
+        )
+    
+    achieved = goals.filter(target_value__gt=0, current_value__gte=F('target_value')).update(
+        is_achieved=True, is_active=False, updated_at=now
+    )
+    
+    invalidate_user_stats(affected_users)
+    return updated, achieved
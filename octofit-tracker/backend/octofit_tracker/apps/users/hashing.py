@@ -0,0 +1,35 @@
+"""
+Parallel password hashing for OctoFit Tracker.
+
+Worker processes are spawned rather than forked, because callers may be
+threaded servers holding open connections and transactions, which a fork
+would copy. A spawned worker imports this module before Django is set up,
+so it must not import models.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+def _init_worker():
+    """Set up Django in a hashing worker process."""
+    import django
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None, chunk_size=50):
+    """Hash passwords with the configured hasher in a process pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) <= chunk_size:
+        return _hash_chunk(passwords)
+    
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+        return [hashed for chunk in pool.map(_hash_chunk, chunks) for hashed in chunk]
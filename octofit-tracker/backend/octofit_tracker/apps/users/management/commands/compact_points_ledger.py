@@ -0,0 +1,35 @@
+"""
+Compact old points ledger entries.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.users.points import compact_ledger
+
+
+class Command(BaseCommand):
+    help = "Fold each user's old points ledger entries into a single compacted entry."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help="Compact entries older than this (default: POINTS_LEDGER_RETENTION_DAYS)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of users compacted per transaction (default: 500)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users, removed = compact_ledger(options['days'], batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted ledger history for {users} users ({removed} entries removed) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,30 @@
+"""
+Recompute fitness goal progress from activity history.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.users.goals import recompute_goal_progress
+
+
+class Command(BaseCommand):
+    help = "Recompute progress of active activity-derived fitness goals and mark reached goals achieved."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help="Only recompute goals of this user ID (repeatable)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated, achieved = recompute_goal_progress(options['users'])
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {updated} goals ({achieved} newly achieved) in {elapsed:.2f}s."
+        ))
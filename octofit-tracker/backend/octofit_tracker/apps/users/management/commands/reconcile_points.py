@@ -0,0 +1,44 @@
+"""
+Reconcile cached point balances with the points ledger.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from octofit_tracker.apps.users.points import find_drift, reconcile_balances
+
+
+class Command(BaseCommand):
+    help = "Compare every user's total_points with their ledger sum and optionally fix differences."
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help="Reset drifted balances to the ledger sum"
+        )
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help="Append adjustment entries so the ledger matches existing balances "
+                 "(use once when introducing the ledger)"
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drift = find_drift()
+        
+        for user_id, balance, ledger_total in drift[:20]:
+            self.stdout.write(f"User {user_id}: balance {balance}, ledger {ledger_total}")
+        if len(drift) > 20:
+            self.stdout.write(f"... and {len(drift) - 20} more")
+        
+        if drift and (options['fix'] or options['adopt']):
+            changed = reconcile_balances(drift, adopt=options['adopt'])
+            action = "Adopted balances" if options['adopt'] else "Reset balances"
+            summary = f"{action} for {changed} users"
+        else:
+            summary = f"{len(drift)} users with drifted balances"
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"{summary} in {elapsed:.2f}s."))
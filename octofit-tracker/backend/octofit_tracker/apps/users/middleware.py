@@ -0,0 +1,57 @@
+"""
+Middleware for OctoFit Tracker users.
+
+CachedAuthenticationMiddleware replaces Django's AuthenticationMiddleware.
+request.user is still resolved lazily from the session, but through the
+cached users of the authentication module, so a logged-in request loads
+the user and profile with at most one query and usually none.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from .authentication import get_cached_user
+from .models import User
+
+
+def get_session_user(request):
+    """
+    Get the user logged in to the request's session.
+    
+    Mirrors django.contrib.auth.get_user(), including the session hash check
+    that logs out other sessions after a password change. Sessions created
+    by backends other than ModelBackend are resolved by Django as before.
+    """
+    try:
+        user_id = User._meta.pk.to_python(request.session[auth.SESSION_KEY])
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    if not issubclass(import_string(backend_path), ModelBackend):
+        return auth.get_user(request)
+    
+    user = get_cached_user(user_id)
+    if user is None:
+        return AnonymousUser()
+    
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Authentication middleware that loads request.user from the user caches."""
+    
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_session_user(request))
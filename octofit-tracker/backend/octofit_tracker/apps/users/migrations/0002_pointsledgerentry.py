@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('activity', 'Activity'), ('challenge', 'Weekly Challenge'), ('achievement', 'Achievement'), ('team_challenge', 'Team Challenge'), ('adjustment', 'Manual Adjustment'), ('compacted', 'Compacted History')], max_length=20)),
+                ('source_id', models.PositiveIntegerField(blank=True, help_text='ID of the activity, challenge or achievement award that earned the points', null=True)),
+                ('points', models.IntegerField()),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pointsledgerentry',
+            index=models.Index(fields=['user', 'created_at'], name='users_point_user_id_95c8ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointsledgerentry',
+            index=models.Index(fields=['created_at'], name='users_point_created_8fd5de_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-19 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_pointsledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_profile_public', True)), fields=['user'], name='userprofile_public_idx'),
+        ),
+    ]
@@ -2,11 +2,12 @@
 User models for OctoFit Tracker.
 
 This module contains the user-related models including user profiles,
-authentication, and fitness preferences.
+authentication, fitness preferences and the points ledger.
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -48,7 +49,7 @@ class User(AbstractUser):
         help_text="Comma-separated list of preferred activities"
     )
     
-    # Tracking
+    # Tracking (cached balance of the points ledger)
     total_points = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -56,6 +57,24 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_full_name()})"
     
+    def save(self, *args, **kwargs):
+        """Save and drop cached copies used by authentication and stats."""
+        from .authentication import invalidate_user
+        from .stats import invalidate_user_stats
+        
+        super().save(*args, **kwargs)
+        invalidate_user(self.pk)
+        invalidate_user_stats([self.pk])
+    
+    def delete(self, *args, **kwargs):
+        # Cached authentication copies are dropped by a post_delete receiver
+        from .stats import invalidate_user_stats
+        
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_user_stats([user_id])
+        return result
+    
     @property
     def bmi(self):
         """Calculate Body Mass Index if height and weight are available."""
@@ -86,8 +105,36 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Public user directory: users joined to public profiles
+            models.Index(
+                fields=['user'],
+                name='userprofile_public_idx',
+                condition=models.Q(is_profile_public=True)
+            ),
+        ]
+    
     def __str__(self):
         return f"Profile for {self.user.username}"
+    
+    def save(self, *args, **kwargs):
+        """Save and drop cached copies of the user and stats, which carry the profile."""
+        from .authentication import invalidate_user
+        from .stats import invalidate_user_stats
+        
+        super().save(*args, **kwargs)
+        invalidate_user(self.user_id)
+        invalidate_user_stats([self.user_id])
+    
+    def delete(self, *args, **kwargs):
+        from .authentication import invalidate_user
+        from .stats import invalidate_user_stats
+        
+        result = super().delete(*args, **kwargs)
+        invalidate_user(self.user_id)
+        invalidate_user_stats([self.user_id])
+        return result
 
 
 class FitnessGoal(models.Model):
@@ -103,7 +150,7 @@ class FitnessGoal(models.Model):
         ('general_fitness', 'General Fitness'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='fitness_goals')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
     goal_type = models.CharField(max_length=20, choices=GOAL_TYPES)
     description = models.TextField()
     target_value = models.FloatField(null=True, blank=True)
@@ -118,9 +165,62 @@ class FitnessGoal(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_goal_type_display()}"
     
+    def save(self, *args, **kwargs):
+        """Save and drop the user's cached stats, which count goals."""
+        from .stats import invalidate_user_stats
+        
+        super().save(*args, **kwargs)
+        invalidate_user_stats([self.user_id])
+    
+    def delete(self, *args, **kwargs):
+        from .stats import invalidate_user_stats
+        
+        result = super().delete(*args, **kwargs)
+        invalidate_user_stats([self.user_id])
+        return result
+    
     @property
     def progress_percentage(self):
         """Calculate progress percentage towards goal."""
         if self.target_value and self.target_value > 0:
             return min(100, (self.current_value / self.target_value) * 100)
-        return 0
\ No newline at end of file
+        return 0
+
+
+class PointsLedgerEntry(models.Model):
+    """
+    Append-only record of a change to a user's points.
+    
+    User.total_points caches the sum of a user's entries and is only
+    changed together with a new entry (see octofit_tracker.apps.users.points).
+    Old entries are periodically compacted into one 'compacted' entry per
+    user.
+    """
+    SOURCE_TYPES = [
+        ('activity', 'Activity'),
+        ('challenge', 'Weekly Challenge'),
+        ('achievement', 'Achievement'),
+        ('team_challenge', 'Team Challenge'),
+        ('adjustment', 'Manual Adjustment'),
+        ('compacted', 'Compacted History'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_ledger')
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPES)
+    source_id = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="ID of the activity, challenge or achievement award that earned the points"
+    )
+    points = models.IntegerField()
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} {self.points:+d} ({self.get_source_type_display()})"
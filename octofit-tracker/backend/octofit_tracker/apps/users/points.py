@@ -0,0 +1,170 @@
+"""
+Points ledger operations for OctoFit Tracker.
+
+Every change to a user's points appends a PointsLedgerEntry and moves
+User.total_points by the same amount with an F() increment in the same
+transaction. Balances are therefore never recomputed by read-modify-write,
+and concurrent writers cannot overwrite each other's points.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import PointsLedgerEntry, User
+from .stats import invalidate_user_stats
+
+
+def credit(user_id, points, source_type, source_id=None, description=''):
+    """
+    Record a points change for one user and return the new balance.
+    
+    Negative points debit the user, e.g. when an activity is deleted.
+    """
+    with transaction.atomic():
+        PointsLedgerEntry.objects.create(
+            user_id=user_id,
+            source_type=source_type,
+            source_id=source_id,
+            points=points,
+            description=description[:200]
+        )
+        User.objects.filter(pk=user_id).update(total_points=models.F('total_points') + points)
+    invalidate_user_stats([user_id])
+    return User.objects.filter(pk=user_id).values_list('total_points', flat=True).first()
+
+
+def credit_many(entries, batch_size=2000):
+    """
+    Record points changes for many users at once.
+    
+    `entries` are unsaved PointsLedgerEntry objects. They are inserted in
+    bulk and balances are moved with one UPDATE per distinct amount.
+    Returns a mapping of user ID to new balance.
+    """
+    if not entries:
+        return {}
+    
+    totals = defaultdict(int)
+    for entry in entries:
+        totals[entry.user_id] += entry.points
+    
+    users_by_amount = defaultdict(list)
+    for user_id, points in totals.items():
+        if points:
+            users_by_amount[points].append(user_id)
+    
+    with transaction.atomic():
+        PointsLedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+        for points, user_ids in users_by_amount.items():
+            User.objects.filter(id__in=user_ids).update(
+                total_points=models.F('total_points') + points
+            )
+    invalidate_user_stats(list(totals))
+    
+    return dict(User.objects.filter(id__in=list(totals)).values_list('id', 'total_points'))
+
+
+def get_ledger_totals():
+    """Get each user's ledger sum with one grouped query."""
+    return dict(
+        PointsLedgerEntry.objects.values('user_id').annotate(
+            total=models.Sum('points')
+        ).values_list('user_id', 'total')
+    )
+
+
+def find_drift(batch_size=5000):
+    """
+    Find users whose cached balance differs from their ledger sum.
+    
+    Returns a list of (user_id, balance, ledger_total).
+    """
+    ledger_totals = get_ledger_totals()
+    drift = []
+    balances = User.objects.values_list('id', 'total_points').order_by('id')
+    for user_id, balance in balances.iterator(chunk_size=batch_size):
+        ledger_total = ledger_totals.get(user_id, 0)
+        if balance != ledger_total:
+            drift.append((user_id, balance, ledger_total))
+    return drift
+
+
+def reconcile_balances(drift, adopt=False, batch_size=2000):
+    """
+    Resolve drift found by find_drift().
+    
+    By default balances are reset to the ledger sum. With adopt=True the
+    ledger is brought in line with the balances instead by appending an
+    adjustment entry per user, which is how balances that predate the
+    ledger are adopted. Returns the number of users changed.
+    """
+    if adopt:
+        # The balances are kept, so only the ledger side is written
+        PointsLedgerEntry.objects.bulk_create([
+            PointsLedgerEntry(
+                user_id=user_id,
+                source_type='adjustment',
+                points=balance - ledger_total,
+                description="Reconciled with existing balance"
+            )
+            for user_id, balance, ledger_total in drift
+        ], batch_size=batch_size)
+        return len(drift)
+    
+    users = [
+        User(id=user_id, total_points=max(ledger_total, 0))
+        for user_id, _, ledger_total in drift
+    ]
+    User.objects.bulk_update(users, ['total_points'], batch_size=batch_size)
+    invalidate_user_stats([user.id for user in users])
+    return len(users)
+
+
+def compact_ledger(retention_days=None, batch_size=500):
+    """
+    Fold ledger entries older than POINTS_LEDGER_RETENTION_DAYS.
+    
+    Each user's old entries are replaced by a single 'compacted' entry
+    dated at the cutoff, so balances and ledger sums are unchanged. Users
+    whose old history is already a single entry are left alone. Users are
+    compacted in batches, each in its own transaction. Returns (users
+    compacted, entries removed).
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'POINTS_LEDGER_RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    
+    old_entries = PointsLedgerEntry.objects.filter(created_at__lt=cutoff)
+    user_ids = list(
+        old_entries.values('user_id').annotate(entries=models.Count('id'))
+        .filter(entries__gt=1).order_by('user_id').values_list('user_id', flat=True)
+    )
+    
+    compacted = removed = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = old_entries.filter(user_id__in=user_ids[start:start + batch_size])
+        with transaction.atomic():
+            groups = list(
+                batch.values('user_id').annotate(
+                    total=models.Sum('points'),
+                    entries=models.Count('id')
+                ).values_list('user_id', 'total', 'entries')
+            )
+            batch.delete()
+            PointsLedgerEntry.objects.bulk_create([
+                PointsLedgerEntry(
+                    user_id=user_id,
+                    source_type='compacted',
+                    points=total,
+                    description=f"{entries} entries before {cutoff:%Y-%m-%d}",
+                    created_at=cutoff
+                )
+                for user_id, total, entries in groups
+            ])
+        compacted += len(groups)
+        removed += sum(entries for _, _, entries in groups) - len(groups)
+    
+    return compacted, removed
@@ -0,0 +1,82 @@
+"""
+User statistics for OctoFit Tracker.
+
+The stats endpoint is requested for every avatar hover, so each user's
+stats and privacy flags are kept as one small record in the shared cache.
+Misses for any number of users are filled with a single query that counts
+goals in correlated subqueries. Records are dropped when the user, profile,
+goals or points change, and again when the transaction making the change
+commits.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import FitnessGoal, User
+
+
+def _stats_cache_key(user_id):
+    return f'user-stats:{user_id}'
+
+
+def _goal_count(**filters):
+    return Coalesce(Subquery(
+        FitnessGoal.objects.filter(user=OuterRef('pk'), **filters).order_by()
+        .values('user').annotate(count=Count('id')).values('count')
+    ), 0)
+
+
+def get_user_stats(user_ids):
+    """
+    Get stats records for users by ID.
+    
+    Returns a mapping of user ID to a dict with total_points, bmi,
+    active_goals, achieved_goals and the profile's show_stats and
+    is_profile_public flags. Unknown users are left out.
+    """
+    keys = {user_id: _stats_cache_key(user_id) for user_id in user_ids}
+    cached = cache.get_many(keys.values())
+    stats = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+    
+    missing = [user_id for user_id in keys if user_id not in stats]
+    if missing:
+        users = User.objects.filter(pk__in=missing).select_related('profile').annotate(
+            active_goals=_goal_count(is_active=True),
+            achieved_goals=_goal_count(is_achieved=True)
+        )
+        
+        loaded = {}
+        for user in users:
+            profile = getattr(user, 'profile', None)
+            loaded[user.pk] = {
+                'total_points': user.total_points,
+                'bmi': user.bmi,
+                'active_goals': user.active_goals,
+                'achieved_goals': user.achieved_goals,
+                'show_stats': profile.show_stats if profile else True,
+                'is_profile_public': profile.is_profile_public if profile else True,
+            }
+        cache.set_many(
+            {keys[user_id]: record for user_id, record in loaded.items()},
+            getattr(settings, 'USER_STATS_CACHE_TTL', 300)
+        )
+        stats.update(loaded)
+    
+    return stats
+
+
+def invalidate_user_stats(user_ids):
+    """
+    Drop cached stats records after users' points, goals or profiles changed.
+    
+    Inside a transaction the records are dropped again once it commits, so
+    a read between the write and the commit cannot cache the old values.
+    """
+    keys = [_stats_cache_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(cache.delete_many, keys))
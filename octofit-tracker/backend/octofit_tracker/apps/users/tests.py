@@ -0,0 +1,490 @@
+"""
+Tests for users.
+
+User.total_points caches the sum of the user's points ledger; every points
+operation must keep the two equal. Roster imports must reject what
+registration would reject. Cached authentication must never outlive the
+access it caches. Cached stats must be refreshed by the writes they summarize.
+Directory and batch lookups take the same queries for any number of users and
+never expose another user's private profile. Activity-derived goals follow
+every activity write.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from octofit_tracker.apps.activities.models import Activity, ActivityType
+
+from .authentication import CachedTokenAuthentication, get_local_cache
+from .models import FitnessGoal, PointsLedgerEntry, User, UserProfile
+from .goals import recompute_goal_progress
+from .points import compact_ledger, credit, find_drift, get_ledger_totals, reconcile_balances
+from .roster import import_roster, parse_roster
+
+
+def create_user(username, **fields):
+    return User.objects.create(username=username, email=f'{username}@example.com', **fields)
+
+
+class PointsLedgerTests(TestCase):
+    """Balances, ledger sums, compaction and reconciliation."""
+    
+    def age_entries(self, user, days):
+        PointsLedgerEntry.objects.filter(user=user).update(
+            created_at=timezone.now() - timedelta(days=days)
+        )
+    
+    def balance(self, user):
+        return User.objects.values_list('total_points', flat=True).get(pk=user.pk)
+    
+    def test_credit_keeps_balance_and_ledger_equal(self):
+        user = create_user('runner')
+        self.assertEqual(credit(user.pk, 30, 'activity', 1), 30)
+        self.assertEqual(credit(user.pk, 20, 'achievement', 2), 50)
+        self.assertEqual(credit(user.pk, -10, 'activity', 1, description='x' * 300), 40)
+        
+        self.assertEqual(self.balance(user), 40)
+        self.assertEqual(get_ledger_totals()[user.pk], 40)
+        self.assertEqual(find_drift(), [])
+    
+    def test_compact_ledger_folds_only_old_entries(self):
+        runner, walker, swimmer = create_user('runner'), create_user('walker'), create_user('swimmer')
+        for points in (10, 20, 30):
+            credit(runner.pk, points, 'activity')
+        self.age_entries(runner, 100)
+        credit(runner.pk, 5, 'activity')
+        credit(walker.pk, 7, 'activity')
+        credit(walker.pk, 8, 'activity')
+        # A single old entry is already compact
+        credit(swimmer.pk, 9, 'activity')
+        self.age_entries(swimmer, 100)
+        totals = get_ledger_totals()
+        
+        self.assertEqual(compact_ledger(retention_days=90), (1, 2))
+        self.assertEqual(get_ledger_totals(), totals)
+        self.assertEqual(find_drift(), [])
+        
+        cutoff = timezone.now() - timedelta(days=90)
+        old = PointsLedgerEntry.objects.filter(user=runner, created_at__lt=cutoff + timedelta(minutes=1))
+        self.assertEqual(list(old.values_list('source_type', 'points')), [('compacted', 60)])
+        self.assertEqual(
+            sorted(PointsLedgerEntry.objects.filter(user=runner).values_list('points', flat=True)), [5, 60]
+        )
+        self.assertEqual(PointsLedgerEntry.objects.filter(user=walker).count(), 2)
+        self.assertEqual(PointsLedgerEntry.objects.filter(user=swimmer).count(), 1)
+        
+        self.assertEqual(compact_ledger(retention_days=90), (0, 0))
+    
+    def test_reconcile_adopts_balances_that_predate_the_ledger(self):
+        user = create_user('veteran', total_points=500)
+        credit(user.pk, 20, 'activity')
+        drift = find_drift()
+        self.assertEqual(drift, [(user.pk, 520, 20)])
+        
+        self.assertEqual(reconcile_balances(drift, adopt=True), 1)
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(self.balance(user), 520)
+        self.assertEqual(
+            PointsLedgerEntry.objects.get(user=user, source_type='adjustment').points, 500
+        )
+    
+    def test_reconcile_resets_drifted_balances(self):
+        user = create_user('runner')
+        credit(user.pk, 30, 'activity')
+        User.objects.filter(pk=user.pk).update(total_points=999)
+        drift = find_drift()
+        self.assertEqual(drift, [(user.pk, 999, 30)])
+        
+        self.assertEqual(reconcile_balances(drift), 1)
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(self.balance(user), 30)
+
+
+ROSTER_HEADER = 'username,email,password,first_name,last_name,grade_level,date_of_birth\n'
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PERFORMANCE_SAMPLE_RATE=0
+)
+class RosterImportTests(TestCase):
+    """Roster rows are validated, then imported as working accounts."""
+    
+    def parse(self, *lines):
+        return parse_roster(ROSTER_HEADER + ''.join(f'{line}\n' for line in lines))
+    
+    def test_invalid_rows_are_reported(self):
+        create_user('taken')
+        rows, errors = self.parse(
+            'ana,ana@example.com,password1,Ana,Lee,9,2010-01-02',
+            'ana,ana2@example.com,password1,,,,',
+            'ben,ana@EXAMPLE.com,password1,,,,',
+            'taken,taken2@example.com,password1,,,,',
+            'cy,taken@example.com,password1,,,,',
+            'bad name!,bad@example.com,password1,,,,',
+            'dee,not-an-email,password1,,,,',
+            f"eve,eve@example.com,password1,{'x' * 200},,,",
+            'fay,fay@example.com,short,,,,',
+            'gus,gus@example.com,password1,,,13,',
+            'hal,hal@example.com,password1,,,,02/01/2010',
+            ',ivy@example.com,password1,,,,',
+        )
+        self.assertEqual([row['username'] for row in rows], ['ana'])
+        self.assertEqual([line for line, _ in errors], list(range(3, 14)))
+        messages = dict(errors)
+        self.assertEqual(messages[3], "duplicate username or email in roster")
+        self.assertEqual(messages[5], "username or email already registered")
+        self.assertEqual(messages[6], "username or email already registered")
+        self.assertTrue(messages[7].startswith('username:'))
+        self.assertTrue(messages[8].startswith('email:'))
+        self.assertTrue(messages[9].startswith('first_name:'))
+    
+    def test_missing_columns(self):
+        self.assertEqual(
+            parse_roster('username,email\nana,ana@example.com\n'),
+            ([], [(1, 'Missing columns: password')])
+        )
+    
+    def test_import_creates_users_profiles_and_tokens(self):
+        rows, errors = self.parse(
+            'ana,ana@example.com,password1,Ana,Lee,9,2010-01-02',
+            'ben,ben@example.com,password2,,,,',
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(import_roster(rows, workers=1)['created'], 2)
+        
+        ana = User.objects.select_related('profile').get(username='ana')
+        self.assertTrue(ana.check_password('password1'))
+        self.assertEqual((ana.first_name, ana.grade_level, str(ana.date_of_birth)), ('Ana', '9', '2010-01-02'))
+        self.assertIsNotNone(ana.profile.pk)
+        
+        client = APIClient()
+        for user in User.objects.filter(username__in=['ana', 'ben']):
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=user).key}')
+            response = client.get('/api/users/me/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['username'], user.username)
+        
+        self.assertTrue(APIClient().login(username='ben', password='password2'))
+    
+    def test_upload_reports_errors_and_imports_valid_rows(self):
+        admin = create_user('admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        roster = SimpleUploadedFile(
+            'roster.csv',
+            (ROSTER_HEADER + 'ana,ana@example.com,password1,,,,\nana,b@example.com,password1,,,,\n').encode()
+        )
+        response = client.post('/api/users/roster/', {'file': roster}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            response.data['errors'], [{'line': 3, 'message': "duplicate username or email in roster"}]
+        )
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PERFORMANCE_SAMPLE_RATE=0
+)
+class AuthenticationCacheTests(TestCase):
+    """Cached token and session users stop working as soon as access is revoked."""
+    
+    def setUp(self):
+        cache.clear()
+        get_local_cache().clear()
+        self.addCleanup(get_local_cache().clear)
+        self.user = create_user('runner')
+        self.user.set_password('password1')
+        self.user.save()
+        UserProfile.objects.create(user=self.user)
+        self.token = Token.objects.create(user=self.user)
+    
+    def authenticate(self, key=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+        return CachedTokenAuthentication().authenticate(request)
+    
+    def assertTokenRejected(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+    
+    def session_client(self):
+        client = APIClient()
+        self.assertTrue(client.login(username='runner', password='password1'))
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        return client
+    
+    def assertSessionRejected(self, client):
+        self.assertEqual(client.get('/api/users/me/').status_code, 403)
+    
+    def test_cached_token_authenticates_without_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, auth = self.authenticate()
+            self.assertEqual((user.pk, auth.key), (self.user.pk, self.token.key))
+            self.assertFalse(user.profile.is_profile_public is None)
+        
+        # Another process finds the user in the shared cache
+        get_local_cache().clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate()[0].pk, self.user.pk)
+    
+    def test_token_rejected_after_logout(self):
+        self.authenticate()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.post('/api/users/logout/').status_code, 200)
+        self.assertTokenRejected()
+    
+    def test_token_rejected_after_delete(self):
+        other = Token.objects.create(user=create_user('walker'))
+        self.authenticate()
+        self.authenticate(other.key)
+        self.token.delete()
+        self.assertTokenRejected()
+        
+        Token.objects.filter(pk=other.pk).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(other.key)
+    
+    def test_deactivated_user_rejected(self):
+        self.authenticate()
+        client = self.session_client()
+        self.user.is_active = False
+        self.user.save()
+        self.assertTokenRejected()
+        self.assertSessionRejected(client)
+    
+    def test_session_rejected_after_password_change(self):
+        client = self.session_client()
+        self.user.set_password('password2')
+        self.user.save()
+        self.assertSessionRejected(client)
+    
+    def test_session_rejected_after_logout(self):
+        client = self.session_client()
+        self.assertEqual(client.post('/api/users/logout/').status_code, 200)
+        self.assertSessionRejected(client)
+    
+    def test_deleted_user_rejected(self):
+        self.authenticate()
+        client = self.session_client()
+        self.user.delete()
+        self.assertTokenRejected()
+        self.assertSessionRejected(client)
+    
+    def test_user_deleted_in_bulk_rejected(self):
+        self.authenticate()
+        client = self.session_client()
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertTokenRejected()
+        self.assertSessionRejected(client)
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0)
+class UserStatsTests(TestCase):
+    """Stats come from one query, are cached, and change with activities and goals."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('runner')
+        UserProfile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.activity_type = ActivityType.objects.create(name='Running', category='cardio')
+    
+    def get_stats(self, user=None):
+        response = self.client.get(f'/api/users/{(user or self.user).pk}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_stats_refresh_after_activity_write(self):
+        self.assertEqual(self.get_stats()['total_points'], 0)
+        with self.assertNumQueries(0):
+            self.get_stats()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            activity = Activity.objects.create(
+                user=self.user,
+                activity_type=self.activity_type,
+                name='Run',
+                duration_minutes=30,
+                activity_date=timezone.now()
+            )
+        self.assertEqual(self.get_stats()['total_points'], activity.points_earned)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.delete()
+        self.assertEqual(self.get_stats()['total_points'], 0)
+    
+    def test_stats_refresh_after_goal_write(self):
+        self.assertEqual(self.get_stats()['active_goals'], 0)
+        goal = FitnessGoal.objects.create(user=self.user, goal_type='strength', description='Lift')
+        self.assertEqual(self.get_stats()['active_goals'], 1)
+        
+        self.client.post(f'/api/users/goals/{goal.pk}/mark_achieved/')
+        stats = self.get_stats()
+        self.assertEqual((stats['active_goals'], stats['achieved_goals']), (0, 1))
+    
+    def test_batch_stats_take_one_query_for_any_number_of_users(self):
+        for count in (2, 15):
+            cache.clear()
+            users = [create_user(f'user{count}-{i}') for i in range(count)]
+            ids = ','.join(str(user.pk) for user in users)
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/api/users/stats/?ids={ids}')
+            self.assertEqual([row['user_id'] for row in response.data], [user.pk for user in users])
+            with self.assertNumQueries(0):
+                self.client.get(f'/api/users/stats/?ids={ids}')
+    
+    def test_private_stats_hidden_from_others(self):
+        other = create_user('walker')
+        UserProfile.objects.create(user=other, is_profile_public=False, show_stats=False)
+        response = self.client.get(f'/api/users/{other.pk}/stats/')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(f'/api/users/stats/?ids={other.pk},{self.user.pk}')
+        self.assertEqual(response.data[0], {'user_id': other.pk, 'detail': 'User stats are private.'})
+        self.assertEqual(response.data[1]['user_id'], self.user.pk)
+        
+        self.client.force_authenticate(other)
+        self.assertEqual(self.get_stats(other)['total_points'], 0)
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0)
+class UserDirectoryTests(TestCase):
+    """The public directory and batch lookup are constant-query and respect privacy."""
+    
+    def setUp(self):
+        self.user = create_user('runner')
+        UserProfile.objects.create(user=self.user, is_profile_public=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def create_users(self, count, public=True):
+        users = [create_user(f'user{User.objects.count()}-{i}') for i in range(count)]
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, is_profile_public=public) for user in users
+        ])
+        return users
+    
+    def test_directory_takes_two_queries_for_any_number_of_users(self):
+        for count in (2, 15):
+            users = self.create_users(count)
+            # A count for the paginator, then the page with profiles joined
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/users/')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(users[-1].pk, [row['id'] for row in response.data['results']])
+            self.assertIsNotNone(response.data['results'][0]['profile'])
+    
+    def test_directory_lists_only_public_profiles(self):
+        public = self.create_users(2)
+        self.create_users(2, public=False)
+        response = self.client.get('/api/users/')
+        self.assertEqual([row['id'] for row in response.data['results']], [user.pk for user in public])
+    
+    def test_batch_takes_one_query_for_any_number_of_users(self):
+        for count in (2, 15):
+            users = self.create_users(count)
+            ids = ','.join(str(user.pk) for user in reversed(users))
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/api/users/batch/?ids={ids}')
+            self.assertEqual([row['id'] for row in response.data], [user.pk for user in reversed(users)])
+    
+    def test_batch_never_returns_other_private_profiles(self):
+        public = self.create_users(1)[0]
+        private = self.create_users(1, public=False)[0]
+        response = self.client.get(f'/api/users/batch/?ids={private.pk},{public.pk},{self.user.pk}')
+        self.assertEqual([row['id'] for row in response.data], [public.pk, self.user.pk])
+        
+        # Users without a profile are not public either
+        hidden = create_user('hidden')
+        response = self.client.get(f'/api/users/batch/?ids={hidden.pk}')
+        self.assertEqual(response.data, [])
+    
+    def test_batch_rejects_bad_ids(self):
+        for query in ('', '?ids=', '?ids=1,x', '?ids=' + ','.join(map(str, range(1, 102)))):
+            self.assertEqual(self.client.get(f'/api/users/batch/{query}').status_code, 400)
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0)
+class FitnessGoalProgressTests(TestCase):
+    """Activity writes move matching goals up and down and mark them achieved."""
+    
+    def setUp(self):
+        self.user = create_user('runner')
+        self.goal = FitnessGoal.objects.create(
+            user=self.user, goal_type='endurance', description='Run an hour', target_value=60
+        )
+        self.cardio = ActivityType.objects.create(name='Running', category='cardio')
+        self.strength = ActivityType.objects.create(name='Lifting', category='strength')
+    
+    def log(self, minutes, activity_type=None, activity_date=None):
+        return Activity.objects.create(
+            user=self.user,
+            activity_type=activity_type or self.cardio,
+            name='Workout',
+            duration_minutes=minutes,
+            activity_date=activity_date or timezone.now()
+        )
+    
+    def assertGoal(self, current_value, is_achieved=False):
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_value, current_value)
+        self.assertEqual((self.goal.is_achieved, self.goal.is_active), (is_achieved, not is_achieved))
+    
+    def test_progress_follows_edits_and_deletes(self):
+        activity = self.log(30)
+        self.assertGoal(30)
+        
+        activity.duration_minutes = 20
+        activity.save()
+        self.assertGoal(20)
+        
+        # Moving the activity to a category the goal ignores removes its minutes
+        activity.activity_type = self.strength
+        activity.save()
+        self.assertGoal(0)
+        
+        activity.activity_type = self.cardio
+        activity.save()
+        self.assertGoal(20)
+        
+        activity.delete()
+        self.assertGoal(0)
+    
+    def test_goal_achieved_when_target_reached(self):
+        self.log(40)
+        self.assertGoal(40)
+        self.log(25)
+        self.assertGoal(65, is_achieved=True)
+        
+        # Achieved goals are no longer tracked
+        self.log(10)
+        self.assertGoal(65, is_achieved=True)
+    
+    def test_activities_before_the_goal_do_not_count(self):
+        self.log(90, activity_date=self.goal.created_at - timedelta(days=1))
+        self.assertGoal(0)
+        self.assertEqual(recompute_goal_progress([self.user.pk]), (1, 0))
+        self.assertGoal(0)
+    
+    def test_recompute_matches_incremental_progress(self):
+        self.log(20)
+        self.log(15, activity_type=self.strength)
+        FitnessGoal.objects.filter(pk=self.goal.pk).update(current_value=0)
+        self.assertEqual(recompute_goal_progress([self.user.pk]), (1, 0))
+        self.assertGoal(20)
+        
+        # Progress lost before the target was reached is restored and achieves the goal
+        FitnessGoal.objects.filter(pk=self.goal.pk).update(current_value=0)
+        self.log(40)
+        self.assertGoal(40)
+        self.assertEqual(recompute_goal_progress(), (1, 1))
+        self.assertGoal(60, is_achieved=True)
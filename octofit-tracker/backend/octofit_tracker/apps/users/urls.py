@@ -13,5 +13,7 @@ router.register(r'goals', views.FitnessGoalViewSet, basename='fitnessgoal')
 urlpatterns = [
     path('register/', views.UserRegistrationView.as_view(), name='user-register'),
     path('login/', views.LoginView.as_view(), name='user-login'),
+    path('logout/', views.LogoutView.as_view(), name='user-logout'),
+    path('roster/', views.RosterImportView.as_view(), name='user-roster-import'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -2,15 +2,24 @@
 Views for user-related endpoints.
 
 This module contains viewsets and views for user registration,
-authentication, profiles, and fitness goals.
+roster import, authentication, profiles, and fitness goals.
 """
+import csv
+import io
+
 from rest_framework import generics, status, viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import login
+from django.contrib.auth import login, logout
+from django.db import models
+from django.http import Http404
 
 from .models import User, UserProfile, FitnessGoal
+from .roster import import_roster, parse_roster
+from .stats import get_user_stats
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, UserProfileSerializer,
     FitnessGoalSerializer, LoginSerializer
@@ -38,6 +47,34 @@ class UserRegistrationView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class RosterImportView(generics.GenericAPIView):
+    """Admin view for creating student accounts from a CSV roster."""
+    parser_classes = [MultiPartParser]
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'detail': 'Upload the roster CSV as "file".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            rows, errors = parse_roster(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error):
+            return Response(
+                {'detail': 'Roster must be a UTF-8 CSV file.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = import_roster(rows) if rows else {'created': 0}
+        return Response({
+            **result,
+            'errors': [{'line': line, 'message': message} for line, message in errors],
+        }, status=status.HTTP_201_CREATED if rows else status.HTTP_400_BAD_REQUEST)
+
+
 class LoginView(generics.GenericAPIView):
     """View for user login."""
     serializer_class = LoginSerializer
@@ -60,6 +97,18 @@ class LoginView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class LogoutView(generics.GenericAPIView):
+    """View for user logout."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        # Revoke the API token; the Token post_delete receiver drops it from the caches
+        Token.objects.filter(user=request.user).delete()
+        logout(request)
+        
+        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet for user management."""
     queryset = User.objects.all()
@@ -69,20 +118,58 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter users based on permissions."""
         if self.action == 'list':
-            # Only show public profiles
-            return User.objects.filter(profile__is_profile_public=True)
+            # Only show public profiles; the serializer nests the profile.
+            # Ordering by the profile's user_id (the same value as the user
+            # ID) lets the partial public-profile index drive the join unsorted.
+            return User.objects.filter(
+                profile__is_profile_public=True
+            ).select_related('profile').order_by('profile__user_id')
         return super().get_queryset()
     
+    @staticmethod
+    def _get_requested_ids(request, limit=100):
+        """Parse ?ids=1,2,3 into a list of unique user IDs."""
+        try:
+            user_ids = [
+                int(user_id) for user_id in request.query_params.get('ids', '').split(',') if user_id
+            ]
+        except ValueError:
+            raise ParseError('ids must be a comma-separated list of user IDs.')
+        if not user_ids:
+            raise ParseError('Provide user IDs as ?ids=1,2,3.')
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        if len(user_ids) > limit:
+            raise ParseError(f'Request at most {limit} users at a time.')
+        return user_ids
+    
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """Get several users by ID (?ids=1,2,3), limited to public profiles and yourself."""
+        user_ids = self._get_requested_ids(request)
+        users = User.objects.filter(
+            models.Q(profile__is_profile_public=True) | models.Q(pk=request.user.pk),
+            pk__in=user_ids
+        ).select_related('profile').in_bulk()
+        
+        serializer = self.get_serializer(
+            [users[user_id] for user_id in user_ids if user_id in users], many=True
+        )
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get', 'put'])
     def me(self, request):
         """Get or update current user profile."""
+        # request.user may come from the token cache, so its points can lag
+        # and saving it could overwrite the current balance
+        user = User.objects.select_related('profile').get(pk=request.user.pk)
         if request.method == 'GET':
-            serializer = self.get_serializer(request.user)
+            serializer = self.get_serializer(user)
             return Response(serializer.data)
         
         elif request.method == 'PUT':
             serializer = self.get_serializer(
-                request.user, 
+                user, 
                 data=request.data, 
                 partial=True
             )
@@ -90,28 +177,59 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data)
     
+    @staticmethod
+    def _visible_stats(request, user_id, record):
+        """Get the public part of a stats record, or None if the stats are private."""
+        # Check privacy settings
+        if (user_id != request.user.pk and
+            not record['show_stats'] and
+            not record['is_profile_public']):
+            return None
+        
+        return {
+            'total_points': record['total_points'],
+            'bmi': record['bmi'],
+            'active_goals': record['active_goals'],
+            'achieved_goals': record['achieved_goals'],
+        }
+    
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
         """Get user fitness statistics."""
-        user = self.get_object()
+        try:
+            user_id = int(pk)
+        except ValueError:
+            raise Http404
         
-        # Check privacy settings
-        if (user != request.user and 
-            not user.profile.show_stats and 
-            not user.profile.is_profile_public):
+        record = get_user_stats([user_id]).get(user_id)
+        if record is None:
+            raise Http404
+        
+        stats = self._visible_stats(request, user_id, record)
+        if stats is None:
             return Response(
                 {'detail': 'User stats are private.'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        stats = {
-            'total_points': user.total_points,
-            'bmi': user.bmi,
-            'active_goals': user.fitness_goals.filter(is_active=True).count(),
-            'achieved_goals': user.fitness_goals.filter(is_achieved=True).count(),
-        }
-        
         return Response(stats)
+    
+    @action(detail=False, methods=['get'], url_path='stats', url_name='batch-stats')
+    def batch_stats(self, request):
+        """Get fitness statistics for several users (?ids=1,2,3)."""
+        user_ids = self._get_requested_ids(request)
+        records = get_user_stats(user_ids)
+        results = []
+        for user_id in user_ids:
+            if user_id not in records:
+                continue
+            stats = self._visible_stats(request, user_id, records[user_id])
+            if stats is None:
+                results.append({'user_id': user_id, 'detail': 'User stats are private.'})
+            else:
+                results.append({'user_id': user_id, **stats})
+        
+        return Response(results)
 
 
 class UserProfileViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,78 @@
+"""
+Read-replica support for views in OctoFit Tracker.
+
+ReplicaReadMixin runs designated read-only viewset actions with their
+queries routed to the replica. ReplicaStickinessMiddleware remembers users
+who just wrote, in the shared cache, and the mixin keeps their reads on the
+primary for REPLICA_STICKY_SECONDS so replication lag never hides a change
+they made.
+"""
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import read_from_replica, replica_configured
+
+
+def _sticky_cache_key(user_id):
+    return f'db-sticky:{user_id}'
+
+
+def mark_recent_write(user):
+    """Keep a user's reads on the primary for REPLICA_STICKY_SECONDS."""
+    if user.is_authenticated:
+        cache.set(
+            _sticky_cache_key(user.pk), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        )
+
+
+def has_recent_write(user):
+    return user.is_authenticated and cache.get(_sticky_cache_key(user.pk), False)
+
+
+class ReplicaReadMixin:
+    """
+    Viewset mixin that serves replica_actions from the read replica.
+    
+    replica_actions is a set of action names, or None for every action.
+    Only safe methods are routed, and only for users without recent writes.
+    """
+    replica_actions = None
+    
+    def dispatch(self, request, *args, **kwargs):
+        # initial() enters read_from_replica() once the action and user are
+        # known; leaving it here covers views that raise as well as respond
+        self._replica_reads = ExitStack()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            self._replica_reads.close()
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            replica_configured()
+            and request.method in SAFE_METHODS
+            and (self.replica_actions is None or self.action in self.replica_actions)
+            and not has_recent_write(request.user)
+        ):
+            self._replica_reads.enter_context(read_from_replica())
+
+
+class ReplicaStickinessMiddleware:
+    """Mark users whose request wrote (any successful unsafe method)."""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            mark_recent_write(request.user)
+        return response
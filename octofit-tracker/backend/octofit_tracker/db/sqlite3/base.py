@@ -0,0 +1,65 @@
+"""
+SQLite database backend for OctoFit Tracker.
+
+Django's SQLite backend with settings for concurrent web workers. Every new
+connection applies PRAGMAS (write-ahead logging so readers never wait for
+writers, a busy timeout so writers queue instead of failing with "database
+is locked", and larger page and mmap caches). Transactions opened by
+atomic() start with BEGIN IMMEDIATE, so a transaction that reads before it
+writes takes the write lock up front instead of failing when it tries to
+upgrade a stale read snapshot. Every atomic() block therefore holds the
+write lock until it ends: keep read-only work and file or network I/O
+outside atomic blocks.
+
+OPTIONS:
+    pragmas             PRAGMA values merged over PRAGMAS
+    transaction_mode    DEFERRED, IMMEDIATE (default) or EXCLUSIVE
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable at checkpoints; a power loss can only drop the latest commits
+    'synchronous': 'NORMAL',
+    # Negative sizes are KiB: 64 MiB page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(conn, pragmas):
+    """Set PRAGMA values on a sqlite3 connection."""
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        # Our options must not reach sqlite3.connect()
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        self.transaction_mode = options.get('transaction_mode', 'IMMEDIATE').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}."
+            )
+        
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+    
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,183 @@
+"""
+Tests for the database backend.
+
+The test database is in memory, where SQLite ignores write-ahead logging,
+so the backend is opened on a temporary file with the configured settings.
+Routing is tested with a 'replica' alias opened on the same in-memory
+database, counting the queries each alias runs.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from octofit_tracker.apps.activities.models import Activity, ActivityType, WeeklyPointsWindow
+from octofit_tracker.apps.users.models import User
+
+from .routers import REPLICA_DB_ALIAS, ReplicaRouter, read_from_replica
+from .sqlite3.base import DatabaseWrapper
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    """Connections use WAL and a busy timeout; atomic() takes the write lock up front."""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+    
+    def open(self, alias='sqlite-test', **options):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': str(Path(self.directory) / 'db.sqlite3'),
+            'OPTIONS': {**connections['default'].settings_dict['OPTIONS'], **options},
+        }
+        # Registered so transaction.atomic(using=alias) finds it
+        connections[alias] = wrapper = DatabaseWrapper(settings_dict, alias=alias)
+        self.addCleanup(delattr, connections._connections, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+    
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+    
+    def test_configured_backend(self):
+        self.assertIsInstance(connections['default'], DatabaseWrapper)
+        self.assertEqual(connections['default'].settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+    
+    def test_connection_pragmas(self):
+        wrapper = self.open()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        
+        wrapper = self.open(alias='sqlite-test-2', pragmas={'busy_timeout': 250})
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 250)
+    
+    def test_atomic_begins_immediate(self):
+        wrapper = self.open()
+        statements = []
+        
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+        
+        with wrapper.execute_wrapper(record):
+            with transaction.atomic(using=wrapper.alias):
+                pass
+        self.assertEqual(statements, ['BEGIN IMMEDIATE'])
+    
+    def test_atomic_takes_the_write_lock_before_reading(self):
+        writer = self.open()
+        reader = self.open(alias='sqlite-test-2', pragmas={'busy_timeout': 0})
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value integer)')
+        
+        with transaction.atomic(using=writer.alias):
+            # The second transaction fails as it begins, before reading a snapshot
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                with transaction.atomic(using=reader.alias):
+                    pass
+        with transaction.atomic(using=reader.alias):
+            reader.cursor().execute('INSERT INTO counter VALUES (1)')
+    
+    def test_invalid_transaction_mode(self):
+        wrapper = self.open(transaction_mode='LAZY')
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """replica_actions read from the replica; writes and recent writers use the primary."""
+    
+    def setUp(self):
+        # A second connection to the shared in-memory test database. Rows
+        # must be committed to be visible to it, hence TransactionTestCase.
+        replica = {**connections[DEFAULT_DB_ALIAS].settings_dict}
+        connections[REPLICA_DB_ALIAS] = DatabaseWrapper(replica, alias=REPLICA_DB_ALIAS)
+        self.addCleanup(delattr, connections._connections, REPLICA_DB_ALIAS)
+        self.addCleanup(connections[REPLICA_DB_ALIAS].close)
+        patcher = mock.patch.dict(settings.DATABASES, {REPLICA_DB_ALIAS: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        
+        self.user = User.objects.create(username='runner', email='runner@example.com')
+        self.activity_type = ActivityType.objects.create(name='Running', category='cardio')
+        # The daily rotation writes, so get it out of the way of the counts
+        WeeklyPointsWindow.rotate_if_due()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def get(self, url, **kwargs):
+        """GET url, returning the response and the query counts on each alias."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+                response = self.client.get(url, **kwargs)
+        return response, len(primary), len(replica)
+    
+    def test_replica_actions_read_from_replica(self):
+        response, primary, replica = self.get('/api/activities/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+        
+        # Other actions of the same viewset stay on the primary
+        response, primary, replica = self.get('/api/activities/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+    
+    def test_writes_and_recent_writers_use_the_primary(self):
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+            response = self.client.post('/api/activities/', {
+                'name': 'Run',
+                'activity_type': self.activity_type.pk,
+                'duration_minutes': 30,
+                'activity_date': timezone.now().isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(replica), 0)
+        
+        # The writer reads its own write from the primary
+        response, primary, replica = self.get('/api/activities/summary/')
+        self.assertEqual(response.data['total_activities'], 1)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        
+        # Other users are not sticky
+        self.client.force_authenticate(User.objects.create(username='walker', email='walker@example.com'))
+        response, primary, replica = self.get('/api/activities/summary/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+        
+        # Writes inside read_from_replica() still go to the primary
+        with read_from_replica():
+            with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+                User.objects.create(username='swimmer', email='swimmer@example.com')
+                # So do reads in a transaction on the primary, which must see its writes
+                with transaction.atomic():
+                    self.assertTrue(User.objects.filter(username='swimmer').exists())
+        self.assertEqual(len(replica), 0)
+    
+    def test_routing_reset_after_view_raises(self):
+        with mock.patch.object(WeeklyPointsWindow, 'totals_for', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.get('/api/activities/summary/')
+        
+        self.assertIsNone(ReplicaRouter().db_for_read(User))
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+            list(Activity.objects.all())
+        self.assertEqual(len(replica), 0)
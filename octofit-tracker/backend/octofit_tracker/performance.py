@@ -0,0 +1,168 @@
+"""
+Per-request performance instrumentation for OctoFit Tracker.
+
+PerformanceMiddleware times a sample of requests (PERFORMANCE_SAMPLE_RATE,
+1% by default) and measures SQL query count, database time, time in the
+view, time rendering the response data and total wall time. Sampled
+responses carry a Server-Timing header, which browsers show in the
+network panel:
+
+    Server-Timing: db;dur=12.4;desc="9 queries", view;dur=30.2, render;dur=1.8, total;dur=33.0
+
+Each sampled request also writes one JSON line to the
+octofit_tracker.performance logger. Queries slower than
+PERFORMANCE_SLOW_QUERY_MS are logged to octofit_tracker.performance.sql
+with their SQL and the view that ran them, e.g. TeamViewSet.stats.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('octofit_tracker.performance')
+sql_logger = logging.getLogger('octofit_tracker.performance.sql')
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def get_view_name(view_func, method):
+    """Name a resolved view after its class and action, e.g. TeamViewSet.stats."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    # Viewset views map HTTP methods to actions; other class-based views use the method
+    actions = getattr(view_func, 'actions', None) or {}
+    return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+class RequestMetrics:
+    """
+    Timings collected while one request is handled.
+    
+    An instance is installed as an execute wrapper on every database
+    connection, so it sees each query the request runs.
+    """
+    
+    def __init__(self, request):
+        self.request = request
+        self.started = time.perf_counter()
+        self.slow_query_seconds = getattr(settings, 'PERFORMANCE_SLOW_QUERY_MS', 100) / 1000
+        self.view_name = None
+        self.view_started = None
+        self.render_started = None
+        self.render_finished = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += duration
+            if duration >= self.slow_query_seconds:
+                self.slow_queries += 1
+                sql_logger.warning(json.dumps({
+                    'event': 'slow_query',
+                    'view': self.view_name,
+                    'method': self.request.method,
+                    'path': self.request.path,
+                    'database': context['connection'].alias,
+                    'duration_ms': _ms(duration),
+                    'many': many,
+                    'sql': sql,
+                }))
+    
+    def mark_render(self, response):
+        """Time rendering of a template response (DRF's Response) on this request."""
+        self.render_started = time.perf_counter()
+        
+        def render_finished(rendered):
+            self.render_finished = time.perf_counter()
+        
+        response.add_post_render_callback(render_finished)
+    
+    def summarize(self, response, finished):
+        view_started = self.view_started or self.started
+        view_finished = self.render_started or finished
+        render_seconds = 0.0
+        if self.render_started and self.render_finished:
+            render_seconds = self.render_finished - self.render_started
+        
+        return {
+            'event': 'request',
+            'view': self.view_name,
+            'method': self.request.method,
+            'path': self.request.path,
+            'status': response.status_code,
+            'queries': self.queries,
+            'slow_queries': self.slow_queries,
+            'db_ms': _ms(self.db_seconds),
+            'view_ms': _ms(view_finished - view_started),
+            'render_ms': _ms(render_seconds),
+            'total_ms': _ms(finished - self.started),
+        }
+
+
+def format_server_timing(summary):
+    return ', '.join([
+        f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"',
+        f'view;dur={summary["view_ms"]}',
+        f'render;dur={summary["render_ms"]}',
+        f'total;dur={summary["total_ms"]}',
+    ])
+
+
+class PerformanceMiddleware:
+    """
+    Measure a sample of requests and report them in Server-Timing and the log.
+    
+    Place first in MIDDLEWARE so the total covers the other middleware.
+    Requests outside the sample run with no instrumentation at all.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 0.01)
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return self.get_response(request)
+        
+        metrics = request._performance_metrics = RequestMetrics(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        
+        summary = metrics.summarize(response, time.perf_counter())
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', True):
+            timing = format_server_timing(summary)
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+        if summary['total_ms'] >= getattr(settings, 'PERFORMANCE_LOG_MIN_MS', 0):
+            logger.info(json.dumps(summary))
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, '_performance_metrics', None)
+        if metrics is not None:
+            metrics.view_name = get_view_name(view_func, request.method)
+            metrics.view_started = time.perf_counter()
+    
+    def process_template_response(self, request, response):
+        metrics = getattr(request, '_performance_metrics', None)
+        if metrics is not None:
+            metrics.mark_render(response)
+        return response
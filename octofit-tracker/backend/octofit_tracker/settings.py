@@ -27,20 +27,24 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'octofit_tracker.apps.users',
     'octofit_tracker.apps.activities',
     'octofit_tracker.apps.teams',
     'octofit_tracker.apps.leaderboard',
+    'octofit_tracker.apps.tasks',
 ]
 
 MIDDLEWARE = [
+    'octofit_tracker.performance.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'octofit_tracker.apps.users.middleware.CachedAuthenticationMiddleware',
+    'octofit_tracker.db.replica.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,13 +70,41 @@ TEMPLATES = [
 WSGI_APPLICATION = 'octofit_tracker.wsgi.application'
 
 # Database - Using SQLite for development since MongoDB packages aren't available
+# SQLite with WAL, busy timeout and IMMEDIATE transactions (see
+# octofit_tracker/db/sqlite3/base.py); connections are reused across requests
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'octofit_tracker.db.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            },
+        },
     }
 }
 
+# Optional read replica for leaderboard and stats endpoints (see
+# octofit_tracker/db/routers.py). Locally, point DATABASE_REPLICA_NAME at a
+# copy of db.sqlite3 (or at db.sqlite3 itself) to exercise the routing.
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['octofit_tracker.db.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_STICKY_SECONDS = 10
+
+# Custom user model (octofit_tracker.apps.users.models.User)
+AUTH_USER_MODEL = 'users.User'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,6 +138,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'octofit_tracker.apps.users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -114,6 +147,50 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Cache shared by all worker processes (token authentication, ...). Set
+# REDIS_URL in production; the local-memory default is per process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Token and session authentication caches
+# Users kept in each worker's LRU
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+# Seconds a worker trusts its LRU entry; bounds how long a revoked token or
+# deactivated user stays usable on other workers
+AUTH_TOKEN_LOCAL_TTL = 30
+
+# Seconds users are kept in the shared cache
+AUTH_TOKEN_CACHE_TTL = 300
+
+# Seconds per-user stats records are kept in the shared cache
+USER_STATS_CACHE_TTL = 300
+
+# Background task queue (run `python manage.py run_tasks`)
+# Run tasks inline instead of queueing them, e.g. when no worker is running
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER') == '1'
+
+# Attempts before a failing task is marked failed (retries back off 2^n seconds)
+TASK_MAX_ATTEMPTS = 5
+
+# Seconds before a running task whose worker died is queued again
+TASK_RUNNING_TIMEOUT = 600
+
+# Hours finished tasks are kept for latency reporting
+TASK_RETENTION_HOURS = 24
+
 # CORS settings for frontend
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -122,4 +199,72 @@ CORS_ALLOWED_ORIGINS = [
 if os.environ.get('CODESPACE_NAME'):
     CORS_ALLOWED_ORIGINS.append(f"https://{os.environ.get('CODESPACE_NAME')}-3000.app.github.dev")
 
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+
+# Let the frontend read request timings
+CORS_EXPOSE_HEADERS = ['Server-Timing']
+
+# Per-request performance instrumentation (octofit_tracker.performance)
+# Fraction of requests measured (0 disables, 1 measures every request).
+# Each measured request logs a line, so keep this low in production.
+PERFORMANCE_SAMPLE_RATE = float(os.environ.get('PERFORMANCE_SAMPLE_RATE', '0.01'))
+
+# Add a Server-Timing header to measured responses
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', '1') == '1'
+
+# Only log measured requests that took at least this many milliseconds
+PERFORMANCE_LOG_MIN_MS = float(os.environ.get('PERFORMANCE_LOG_MIN_MS', '0'))
+
+# Log the SQL and calling view of queries slower than this many milliseconds
+PERFORMANCE_SLOW_QUERY_MS = float(os.environ.get('PERFORMANCE_SLOW_QUERY_MS', '100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'octofit_tracker': {
+            'handlers': ['console'],
+            'level': os.environ.get('OCTOFIT_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Leaderboard settings
+# Seconds before a worker rebuilds its in-memory ranking indexes from the database
+LEADERBOARD_RANKING_INDEX_TTL = 300
+
+# Seconds before a worker refreshes its score distribution arrays
+LEADERBOARD_DISTRIBUTION_TTL = 60
+
+# Hours between packed rank snapshots kept for change_from_last_period
+LEADERBOARD_SNAPSHOT_INTERVAL_HOURS = 24
+
+# Days rank snapshots are kept before materialize_leaderboards prunes them
+LEADERBOARD_SNAPSHOT_RETENTION_DAYS = 60
+
+# Partition schemes ranked by materialize_leaderboards in addition to everyone
+LEADERBOARD_PARTITION_SCHEMES = ['grade', 'team']
+
+# Directory for memory-mapped leaderboard snapshot files shared by all workers
+LEADERBOARD_SNAPSHOT_DIR = os.environ.get(
+    'LEADERBOARD_SNAPSHOT_DIR', str(BASE_DIR / 'leaderboard_snapshots')
+)
+
+# Seconds before a worker reloads the active achievement catalog
+ACHIEVEMENT_CATALOG_TTL = 60
+
+# Points ledger entries older than this are compacted by compact_points_ledger
+POINTS_LEDGER_RETENTION_DAYS = 90
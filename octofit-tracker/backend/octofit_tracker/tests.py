@@ -0,0 +1,98 @@
+"""
+Tests for performance instrumentation.
+
+Measured requests report their timings in Server-Timing and the log;
+requests outside the sample are left alone.
+"""
+import json
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from octofit_tracker.apps.users.models import User
+
+
+SERVER_TIMING = re.compile(
+    r'db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries", '
+    r'view;dur=(?P<view>[\d.]+), render;dur=(?P<render>[\d.]+), total;dur=(?P<total>[\d.]+)$'
+)
+
+
+@override_settings(
+    PERFORMANCE_SAMPLE_RATE=1,
+    PERFORMANCE_SERVER_TIMING=True,
+    PERFORMANCE_LOG_MIN_MS=0,
+    PERFORMANCE_SLOW_QUERY_MS=10000
+)
+class PerformanceMiddlewareTests(TestCase):
+    """Server-Timing, request summaries, slow queries and sampling."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='runner', email='runner@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/users/{self.user.pk}/stats/'
+    
+    def test_server_timing_and_request_log(self):
+        with self.assertLogs('octofit_tracker.performance', 'INFO') as logs:
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url)
+        
+        timing = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(timing, response['Server-Timing'])
+        self.assertEqual(timing['queries'], '1')
+        self.assertGreaterEqual(float(timing['total']), float(timing['view']))
+        
+        self.assertEqual(len(logs.records), 1)
+        summary = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            {key: summary[key] for key in ('event', 'view', 'method', 'path', 'status', 'queries', 'slow_queries')},
+            {
+                'event': 'request',
+                'view': 'UserViewSet.stats',
+                'method': 'GET',
+                'path': self.url,
+                'status': 200,
+                'queries': 1,
+                'slow_queries': 0,
+            }
+        )
+        for field in ('db', 'view', 'render', 'total'):
+            self.assertEqual(summary[f'{field}_ms'], float(timing[field]))
+    
+    @override_settings(PERFORMANCE_SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        with self.assertLogs('octofit_tracker.performance', 'INFO') as logs:
+            self.client.get(self.url)
+        
+        slow_queries = [record for record in logs.records if record.name == 'octofit_tracker.performance.sql']
+        self.assertEqual(len(slow_queries), 1)
+        self.assertEqual(slow_queries[0].levelname, 'WARNING')
+        slow = json.loads(slow_queries[0].getMessage())
+        self.assertEqual(
+            (slow['event'], slow['view'], slow['database']), ('slow_query', 'UserViewSet.stats', 'default')
+        )
+        self.assertIn('users_user', slow['sql'])
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['slow_queries'], 1)
+    
+    @override_settings(PERFORMANCE_LOG_MIN_MS=10000)
+    def test_fast_requests_not_logged(self):
+        with self.assertNoLogs('octofit_tracker.performance', 'INFO'):
+            response = self.client.get(self.url)
+        self.assertTrue(response.has_header('Server-Timing'))
+    
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0.25)
+    def test_only_sampled_requests_measured(self):
+        with mock.patch('octofit_tracker.performance.random.random', return_value=0.5):
+            with self.assertNoLogs('octofit_tracker.performance', 'DEBUG'):
+                response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Server-Timing'))
+        
+        with mock.patch('octofit_tracker.performance.random.random', return_value=0.1):
+            with self.assertLogs('octofit_tracker.performance', 'INFO'):
+                response = self.client.get(self.url)
+        self.assertTrue(response.has_header('Server-Timing'))